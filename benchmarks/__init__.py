@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Microbenchmarks for the per-keystroke code paths.
+#
+#   python -m benchmarks run -o results.json
+#   python -m benchmarks compare baseline.json results.json
+#
+# Benchmarks are registered with @benchmark. The decorated function does all of its setup
+# and returns the zero-argument callable that is timed.
+import importlib
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+MODULES = [
+    'benchmarks.bench_engine',
+    'benchmarks.bench_identicon',
+    'benchmarks.bench_config',
+    'benchmarks.bench_secret',
+]
+
+REGISTRY = []
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+def benchmark(name, params=(None,)):
+    def decorator(func):
+        for param in params:
+            REGISTRY.append((name if param is None else '%s[%s]' % (name, param), func, param))
+        return func
+    return decorator
+
+
+def load():
+    for module in MODULES:
+        importlib.import_module(module)
+    return REGISTRY
+
+
+def measure(func, param, repeat=5, min_time=0.2):
+    fn = func() if param is None else func(param)
+
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    # autorange stops at 0.2s, scale up for a more stable result on very fast functions
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def run(selected=None, repeat=5, stream=sys.stdout):
+    results = {}
+    for name, func, param in load():
+        if selected and not any(s in name for s in selected):
+            continue
+        try:
+            result = measure(func, param, repeat)
+        except SkipBenchmark as e:
+            stream.write("%-50s skipped (%s)\n" % (name, e))
+            continue
+        results[name] = result
+        stream.write("%-50s %12.2f us\n" % (name, result['min'] * 1e6))
+        stream.flush()
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=1.1, stream=sys.stdout):
+    """
+    Prints the change of every benchmark found in both result sets and returns the names
+    of those that got slower by more than ``threshold``.
+    """
+    regressions = []
+    base_results = baseline['results']
+    current_results = current['results']
+
+    for name in sorted(set(base_results) | set(current_results)):
+        if name not in base_results or name not in current_results:
+            stream.write("%-50s %s\n" % (name, 'new' if name in current_results else 'removed'))
+            continue
+
+        before = base_results[name]['min']
+        after = current_results[name]['min']
+        ratio = after / before if before else float('inf')
+        marker = ''
+        if ratio > threshold:
+            marker = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            marker = '  improved'
+        stream.write("%-50s %12.2f us -> %12.2f us  x%.2f%s\n" % (name, before * 1e6, after * 1e6, ratio, marker))
+
+    return regressions
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import sys
+from argparse import ArgumentParser
+
+from benchmarks import compare, run
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog='python -m benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('-o', '--output', help='Write the results as JSON to this file')
+    run_parser.add_argument('-k', '--select', action='append', help='Only run benchmarks containing this string')
+    run_parser.add_argument('-r', '--repeat', type=int, default=5)
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=1.1,
+                                help='Slowdown factor reported as regression (default: %(default)s)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run(args.select, args.repeat)
+        if args.output:
+            with open(args.output, 'w') as o:
+                json.dump(results, o, indent=2, sort_keys=True)
+        return 0
+
+    with open(args.baseline) as i:
+        baseline = json.load(i)
+    with open(args.current) as i:
+        current = json.load(i)
+    return 1 if compare(baseline, current, args.threshold) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
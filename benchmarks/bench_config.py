@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import atexit
+import os
+import tempfile
+
+from benchmarks import benchmark
+from esgp import config
+from esgp.storage import IniStorage, SqliteStorage
+
+SIZES = [10, 1000, 100000]
+BACKENDS = {
+    'ini': ('.cfg', IniStorage),
+    'sqlite': ('.sqlite', SqliteStorage),
+}
+PARAMS = ['%s-%s' % (backend, size) for backend in sorted(BACKENDS) for size in SIZES]
+
+
+def _configuration(size, storage=None):
+    c = config.Configuration(storage)
+    for i in range(size):
+        c.domain_settings.append({
+            'domain': 'host%s.example%s.com' % (i, i % 97),
+            'algorithm': 'SHA' if i % 2 else 'MD5',
+            'length': str(8 + i % 16),
+        })
+    c.reindex()
+    return c
+
+
+def _storage(param):
+    backend, size = param.split('-')
+    suffix, storage_class = BACKENDS[backend]
+
+    fd, path = tempfile.mkstemp(prefix='esgp-bench-', suffix=suffix)
+    os.close(fd)
+    atexit.register(os.remove, path)
+
+    storage = storage_class(path)
+    _configuration(int(size), storage).write()
+    return storage, int(size)
+
+
+@benchmark('Configuration.read', PARAMS)
+def bench_read(param):
+    storage, size = _storage(param)
+    return lambda: config.Configuration(storage).read()
+
+
+@benchmark('Configuration.write', PARAMS)
+def bench_write(param):
+    storage, size = _storage(param)
+    c = _configuration(size, storage)
+
+    def write():
+        # write() resets the changes; without this only the first run would be a full write.
+        # Not reindex(), which would be timed as well
+        c._changes = None
+        c.write()
+    return write
+
+
+@benchmark('Configuration.write_one', PARAMS)
+def bench_write_one(param):
+    # what the settings dialog does after editing a single row
+    storage, size = _storage(param)
+    c = config.Configuration(storage)
+    c.read()
+    c.domain_settings
+
+    def write():
+        c.update_domain_settings(0, 'length', 12)
+        c.write()
+    return write
+
+
+@benchmark('Configuration.get_domain_settings', PARAMS)
+def bench_get_domain_settings(param):
+    storage, size = _storage(param)
+    c = config.Configuration(storage)
+    c.read()
+    # an exact hit, a subdomain of a configured domain and a miss
+    domains = ['host%s.example%s.com' % (size // 2, (size // 2) % 97), 'www.host1.example1.com', 'unknown.org']
+
+    def lookup():
+        for domain in domains:
+            c.get_domain_settings(domain)
+    return lookup
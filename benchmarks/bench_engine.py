@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Compares esgp.engine with the upstream supergenpass library:
+#
+#   python -m benchmarks.bench_engine
+#
+# esgp.engine is checked against the fixed GOLDEN_VECTORS first (and so is supergenpass when
+# it is installed); the timing comparison is skipped without supergenpass.
+import sys
+import timeit
+
+from benchmarks import SkipBenchmark, benchmark
+from esgp import engine
+
+DIGESTS = ('md5', 'sha512')
+LENGTHS = (4, 10, 24)
+
+
+def _supergenpass():
+    try:
+        import supergenpass
+    except ImportError:
+        raise SkipBenchmark("supergenpass is not installed")
+    return supergenpass
+
+
+@benchmark('supergenpass.generate', ['%s-%s' % (d, l) for d in DIGESTS for l in LENGTHS])
+def bench_supergenpass(param):
+    generate = _supergenpass().generate
+    digest_name, length = param.split('-')
+    length = int(length)
+    return lambda: generate('master', 'example.com', length, digest_name)
+
+
+@benchmark('engine.generate', ['%s-%s' % (d, l) for d in DIGESTS for l in LENGTHS])
+def bench_engine(param):
+    digest_name, length = param.split('-')
+    length = int(length)
+    return lambda: engine.generate('master', 'example.com', length, digest_name)
+
+
+@benchmark('engine.Engine.generate', DIGESTS)
+def bench_engine_shared_prefix(digest_name):
+    shared = engine.Engine('master', digest_name)
+    return lambda: shared.generate('example.com', 10)
+
+
+# (password, domain, length, digest name, password). Computed from a plain transcription of
+# supergenpass.generate(); with supergenpass installed the library is checked against it too.
+GOLDEN_VECTORS = (
+    ('master', 'example.com', 4, 'md5', 'k2Mi'),
+    ('master', 'example.com', 10, 'md5', 'f82sgYzEk2'),
+    ('master', 'example.com', 24, 'md5', 'f82sgYzEk2HDJ9LxOZUFKwAA'),
+    ('master', 'example.com', 30, 'md5', 'f82sgYzEk2HDJ9LxOZUFKwAA'),
+    ('master', 'example.com', 4, 'sha512', 'c7RX'),
+    ('master', 'example.com', 10, 'sha512', 'rVno8K2d6R'),
+    ('master', 'example.com', 24, 'sha512', 'rVno8K2d6RB6tZHJTssZ68Zt'),
+    ('master', 'example.com', 30, 'sha512', 'rVno8K2d6RB6tZHJTssZ68ZtBtAQcA'),
+    ('', 'example.com', 4, 'md5', 's6sL'),
+    ('', 'example.com', 10, 'md5', 'qZxGBMX886'),
+    ('', 'example.com', 24, 'md5', 'mcMqCsxCVOyfn817awB6KAAA'),
+    ('', 'example.com', 30, 'md5', 'mcMqCsxCVOyfn817awB6KAAA'),
+    ('', 'example.com', 4, 'sha512', 's8Go'),
+    ('', 'example.com', 10, 'sha512', 'qcnj1gR56w'),
+    ('', 'example.com', 24, 'sha512', 'qcnj1gR56w9o8CqkResNmhdO'),
+    ('', 'example.com', 30, 'sha512', 'qcnj1gR56w9o8CqkResNmhdOVolNn6'),
+    ('master', '', 4, 'md5', 'm48W'),
+    ('master', '', 10, 'md5', 'm5mhRnI9fj'),
+    ('master', '', 24, 'md5', 'm5mhRnI9fj71L9utZfnGeAAA'),
+    ('master', '', 30, 'md5', 'm5mhRnI9fj71L9utZfnGeAAA'),
+    ('master', '', 4, 'sha512', 'g5G6'),
+    ('master', '', 10, 'sha512', 'g5G6K7wqno'),
+    ('master', '', 24, 'sha512', 'lPdDFBJWhP9Sk7T61T9XsBjC'),
+    ('master', '', 30, 'sha512', 'lPdDFBJWhP9Sk7T61T9XsBjCqP31o0'),
+    ('correct horse battery staple', 'mail.google.com', 4, 'md5', 'jF0I'),
+    ('correct horse battery staple', 'mail.google.com', 10, 'md5', 'jF0IOi1lL0'),
+    ('correct horse battery staple', 'mail.google.com', 24, 'md5', 'jF0IOi1lL0IScA4fnOL08AAA'),
+    ('correct horse battery staple', 'mail.google.com', 30, 'md5', 'jF0IOi1lL0IScA4fnOL08AAA'),
+    ('correct horse battery staple', 'mail.google.com', 4, 'sha512', 'qA8e'),
+    ('correct horse battery staple', 'mail.google.com', 10, 'sha512', 'qA8eArOTs7'),
+    ('correct horse battery staple', 'mail.google.com', 24, 'sha512', 'qA8eArOTs7gaPHTAxK6gGd8V'),
+    ('correct horse battery staple', 'mail.google.com', 30, 'sha512', 'qA8eArOTs7gaPHTAxK6gGd8VUEjWED'),
+    ('pässwörd€', 'bücher.de', 4, 'md5', 'iIX8'),
+    ('pässwörd€', 'bücher.de', 10, 'md5', 'bqYWwOK07o'),
+    ('pässwörd€', 'bücher.de', 24, 'md5', 'kvBXbypnngc7iV0D1bgkGwAA'),
+    ('pässwörd€', 'bücher.de', 30, 'md5', 'kvBXbypnngc7iV0D1bgkGwAA'),
+    ('pässwörd€', 'bücher.de', 4, 'sha512', 'z3Zw'),
+    ('pässwörd€', 'bücher.de', 10, 'sha512', 'z3Zwsaf7hh'),
+    ('pässwörd€', 'bücher.de', 24, 'sha512', 'z3Zwsaf7hh9fJNJI9Ps2hxru'),
+    ('pässwörd€', 'bücher.de', 30, 'sha512', 'z3Zwsaf7hh9fJNJI9Ps2hxrufxV9Pg'),
+    ('p:w', 'a:b', 4, 'md5', 'uE25'),
+    ('p:w', 'a:b', 10, 'md5', 'x91pSbJWSj'),
+    ('p:w', 'a:b', 24, 'md5', 'mRVDzHbLtEB8sB93rNbBrAAA'),
+    ('p:w', 'a:b', 30, 'md5', 'mRVDzHbLtEB8sB93rNbBrAAA'),
+    ('p:w', 'a:b', 4, 'sha512', 'eW90'),
+    ('p:w', 'a:b', 10, 'sha512', 'dkBCydRi74'),
+    ('p:w', 'a:b', 24, 'sha512', 'dkBCydRi74nkBamPL2YYkqSv'),
+    ('p:w', 'a:b', 30, 'sha512', 'dkBCydRi74nkBamPL2YYkqSvw9uCHv'),
+    ('x', 'a', 4, 'md5', 'fH6y'),
+    ('x', 'a', 10, 'md5', 'fH6yJEF56t'),
+    ('x', 'a', 24, 'md5', 'fH6yJEF56tCyxinw8CUTSgAA'),
+    ('x', 'a', 30, 'md5', 'fH6yJEF56tCyxinw8CUTSgAA'),
+    ('x', 'a', 4, 'sha512', 'qq9X'),
+    ('x', 'a', 10, 'sha512', 'qq9XJ8PgFD'),
+    ('x', 'a', 24, 'sha512', 'qq9XJ8PgFDFTKYC9LXgDk3L7'),
+    ('x', 'a', 30, 'sha512', 'qq9XJ8PgFDFTKYC9LXgDk3L7j88XOq'),
+    ('Tr0ub4dor&3', 'news.ycombinator.com', 4, 'md5', 'zr8H'),
+    ('Tr0ub4dor&3', 'news.ycombinator.com', 10, 'md5', 'mvgwNMUq38'),
+    ('Tr0ub4dor&3', 'news.ycombinator.com', 24, 'md5', 'mvgwNMUq38Ros3vuCHy9rQAA'),
+    ('Tr0ub4dor&3', 'news.ycombinator.com', 30, 'md5', 'mvgwNMUq38Ros3vuCHy9rQAA'),
+    ('Tr0ub4dor&3', 'news.ycombinator.com', 4, 'sha512', 'h3WT'),
+    ('Tr0ub4dor&3', 'news.ycombinator.com', 10, 'sha512', 'h3WTkZ5KE6'),
+    ('Tr0ub4dor&3', 'news.ycombinator.com', 24, 'sha512', 'h3WTkZ5KE6JyKwvn98GKJDCh'),
+    ('Tr0ub4dor&3', 'news.ycombinator.com', 30, 'sha512', 'h3WTkZ5KE6JyKwvn98GKJDCh4CdNze'),
+)
+
+
+def check_golden_vectors():
+    try:
+        generators = [('supergenpass', _supergenpass().generate)]
+    except SkipBenchmark:
+        generators = []
+    generators.append(('engine', engine.generate))
+    generators.append(('engine.Engine', lambda pwd, domain, length, digest_name:
+                       engine.Engine(pwd, digest_name).generate(domain, length)))
+
+    mismatches = 0
+    for pwd, domain, length, digest_name, expected in GOLDEN_VECTORS:
+        for name, generate in generators:
+            actual = generate(pwd, domain, length, digest_name)
+            if actual != expected:
+                mismatches += 1
+                print("MISMATCH %s %r %r %s %s: %s != %s" % (name, pwd, domain, length, digest_name,
+                                                          actual, expected))
+    return mismatches
+
+
+def best_of(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number
+
+
+def main():
+    if check_golden_vectors():
+        return 1
+    print("golden vectors: ok")
+
+    try:
+        supergenpass = _supergenpass()
+    except SkipBenchmark as e:
+        print("%s, skipping the comparison" % e)
+        return 0
+
+    domains = ['host%s.example.com' % i for i in range(1000)]
+
+    for digest_name in DIGESTS:
+        for length in LENGTHS:
+            upstream = best_of(lambda: supergenpass.generate('master', 'example.com', length, digest_name), 2000)
+            ours = best_of(lambda: engine.generate('master', 'example.com', length, digest_name), 2000)
+            print("%-6s length %2d: supergenpass %7.2f us, engine %7.2f us (x%.2f)" % (
+                digest_name, length, upstream * 1e6, ours * 1e6, upstream / ours))
+
+        # many domains under one master password
+        upstream = best_of(lambda: [supergenpass.generate('master', d, 10, digest_name) for d in domains], 3)
+        shared = engine.Engine('master', digest_name)
+        ours = best_of(lambda: [shared.generate(d, 10) for d in domains], 3)
+        print("%-6s %d domains: supergenpass %7.2f ms, engine %7.2f ms (x%.2f)" % (
+            digest_name, len(domains), upstream * 1e3, ours * 1e3, upstream / ours))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
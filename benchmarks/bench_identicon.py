@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import atexit
+import os
+import shutil
+import tempfile
+
+from benchmarks import SkipBenchmark, benchmark
+
+PASSWORDS = {
+    'short': 'secret',
+    'long': 'correct horse battery staple' * 4,
+}
+
+
+def _identicon():
+    try:
+        from esgp import identicon
+    except ImportError as e:
+        raise SkipBenchmark(str(e))
+    return identicon
+
+
+def _gui_application():
+    # QImage needs a QGuiApplication for its image format plugins
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtGui import QGuiApplication
+    return QGuiApplication.instance() or QGuiApplication([])
+
+
+@benchmark('identicon.digest_chain', ['%s-%s' % (d, p) for d in ('md5', 'sha512') for p in sorted(PASSWORDS)])
+def bench_digest_chain(param):
+    identicon_digest = _identicon().identicon_digest
+    digest_name, pwd = param.split('-')
+    pwd = PASSWORDS[pwd]
+    return lambda: identicon_digest(pwd, digest_name)
+
+
+@benchmark('identicon.render', ['md5', 'sha512'])
+def bench_render(digest_name):
+    identicon = _identicon()
+    try:
+        import pydenticon5  # noqa: F401
+    except ImportError as e:
+        raise SkipBenchmark(str(e))
+
+    app = _gui_application()
+    s = identicon.identicon_digest('secret', digest_name)
+
+    def render():
+        app  # keep the application alive for as long as the benchmark runs
+        return identicon.render_identicon(s, 16)
+    return render
+
+
+@benchmark('identicon.disk_cache_get', [16, 32])
+def bench_disk_cache_get(pixels):
+    # the lookup a cold start does instead of drawing; needs no Qt
+    from esgp.diskcache import DiskIdenticonCache, cache_key
+
+    directory = tempfile.mkdtemp(prefix='esgp-bench-')
+    atexit.register(shutil.rmtree, directory)
+
+    cache = DiskIdenticonCache(os.path.join(directory, 'identicons.cache'))
+    key = cache_key('0' * 32, 'md5', pixels, pixels)
+    cache.put(key, pixels, pixels, bytes(pixels * pixels * 4))
+    return lambda: cache.get(key)
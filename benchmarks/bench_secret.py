@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# The secret handling MainWindow does on every keystroke in a password field, with the
+# SecretBuffer against the str copies it replaced:
+#
+#   python -m benchmarks.bench_secret
+#
+# Checks that the identicon digests did not change and compares the memory each keystroke
+# allocates at its peak (tracemalloc). Exits with 1 if the buffer does not allocate less.
+import hashlib
+import sys
+import tracemalloc
+
+from benchmarks import SkipBenchmark, benchmark
+from esgp.pwcache import PasswordCache
+from esgp.secret import SecretBuffer, wipe
+
+MASTER = 'correct horse battery staple'
+SECRET = 'Tr0ub4dor&3'
+DOMAIN = 'example.com'
+
+
+def _identicon_digest():
+    try:
+        from esgp.identicon import identicon_digest
+    except ImportError as e:
+        raise SkipBenchmark(str(e))
+    return identicon_digest
+
+
+def identicon_digest_str(pwd, digest_name):
+    # the hexdigest() string chain esgp.identicon used before
+    s = pwd
+    for i in range(0, 5):
+        h = hashlib.new(digest_name)
+        h.update(s.encode('utf-8'))
+        s = h.hexdigest()
+    return s
+
+
+def str_keystroke(digest_name='sha512'):
+    def keystroke(master, secret):
+        # MainWindow.get_pwd() was called by update_state, generate_identicon and get_generation_inputs
+        get_pwd = lambda: "%s%s" % (master, secret)  # noqa: E731
+        hash((get_pwd(), digest_name))
+        identicon_digest_str(get_pwd(), digest_name)
+        hash((get_pwd(), DOMAIN, 10, digest_name))
+    return keystroke
+
+
+def buffer_keystroke(digest_name='sha512'):
+    identicon_digest = _identicon_digest()
+    secret_buffer = SecretBuffer()
+    cache = PasswordCache()
+
+    def keystroke(master, secret):
+        secret_buffer.set(master, secret)
+        (secret_buffer.generation, digest_name)
+        pwd = secret_buffer.copy()
+        identicon_digest(pwd, digest_name)
+        wipe(pwd)
+        cache.fingerprint(secret_buffer.view(), DOMAIN, 10, digest_name)
+    return keystroke
+
+
+KEYSTROKES = {
+    'str': str_keystroke,
+    'buffer': buffer_keystroke,
+}
+
+
+@benchmark('secret.keystroke', sorted(KEYSTROKES))
+def bench_keystroke(param):
+    keystroke = KEYSTROKES[param]()
+    return lambda: keystroke(MASTER, SECRET)
+
+
+def peak_allocations(keystroke):
+    """
+    Mean peak of the memory allocated while typing MASTER and SECRET, one keystroke at a time.
+    """
+    texts = [(MASTER[:i], '') for i in range(1, len(MASTER) + 1)]
+    texts += [(MASTER, SECRET[:i]) for i in range(1, len(SECRET) + 1)]
+    keystroke(*texts[0])  # warm up caches (e.g. hashlib constructors)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for master, secret in texts:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            keystroke(master, secret)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def main():
+    try:
+        identicon_digest = _identicon_digest()
+    except SkipBenchmark as e:
+        print("skipped: %s" % e)
+        return 0
+
+    for digest_name in ('md5', 'sha512'):
+        for pwd in ('', MASTER, MASTER + SECRET, 'pässwört'):
+            if identicon_digest(pwd.encode('utf-8'), digest_name) != identicon_digest_str(pwd, digest_name):
+                print("MISMATCH %s %r" % (digest_name, pwd))
+                return 1
+    print("identicon digests: ok")
+
+    results = {name: peak_allocations(factory()) for name, factory in sorted(KEYSTROKES.items())}
+    for name, peak in sorted(results.items()):
+        print("%-8s %8.0f bytes peak per keystroke" % (name, peak))
+    return 0 if results['buffer'] < results['str'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# End-to-end keystroke latency of MainWindow without a display:
+#
+#   python -m benchmarks.latency --rounds 20 --budget 16
+#
+# Every keystroke is timed from the key event until the identicon pixmap and the state of
+# the generate button have been updated; Enter is timed until the generated password is
+# shown. Exits with 1 if the selected percentile exceeds the budget.
+import json
+import math
+import os
+import sys
+import time
+from argparse import ArgumentParser, Namespace
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEvent, Qt  # noqa: E402
+from PyQt5.QtGui import QKeyEvent  # noqa: E402
+from PyQt5.QtTest import QTest  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from esgp.config import Configuration  # noqa: E402
+from esgp.ui import MainWindow  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+
+INPUT = [
+    ('master_password', 'correct horse battery'),
+    ('secret_password', 's3cr3t'),
+    ('domain', 'mail.example.com'),
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    # nearest-rank
+    return values[max(0, math.ceil(p / 100.0 * len(values)) - 1)]
+
+
+def _pixmap_key(label):
+    pixmap = label.pixmap()
+    return pixmap.cacheKey() if pixmap is not None else None
+
+
+def wait_until(app, predicate, timeout):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            return False
+        app.processEvents()
+    # let everything that was triggered by the same event run as well
+    app.processEvents()
+    return True
+
+
+class LatencyHarness(object):
+
+    def __init__(self, app, timeout=5.0):
+        self.app = app
+        self.timeout = timeout
+        self.window = MainWindow(Configuration(), None, Namespace(domain=''))
+        self.window.show()
+        self.samples = {field: [] for field, _ in INPUT}
+        self.samples['enter'] = []
+        self.timeouts = 0
+
+    def reset(self):
+        for field, _ in INPUT:
+            getattr(self.window, field).setText('')
+        self.window.identicon_cache.clear()
+        self.app.processEvents()
+
+    def type_key(self, field, char):
+        window = self.window
+        widget = getattr(window, field)
+        updates_identicon = field in ('master_password', 'secret_password')
+        pixmap_before = _pixmap_key(window.identicon_label)
+
+        def updated():
+            if updates_identicon and _pixmap_key(window.identicon_label) == pixmap_before:
+                return False
+            expected = bool(window.master_password.text()) and bool(window.domain.text())
+            return window.generate_button.isEnabled() == expected
+
+        start = time.perf_counter()
+        QTest.keyClicks(widget, char)
+        if not wait_until(self.app, updated, self.timeout):
+            self.timeouts += 1
+        self.samples[field].append(time.perf_counter() - start)
+
+    def press_enter(self):
+        window = self.window
+        window.generated_password.setText('')
+        event = QKeyEvent(QEvent.KeyPress, Qt.Key_Return, Qt.NoModifier, '\r')
+
+        start = time.perf_counter()
+        # goes through MainWindow.eventFilter into generate_password
+        QApplication.sendEvent(window.domain, event)
+        if not wait_until(self.app, lambda: window.generated_password.isVisible() and window.generated_password.text(),
+                          self.timeout):
+            self.timeouts += 1
+        self.samples['enter'].append(time.perf_counter() - start)
+
+    def run(self, rounds):
+        for _ in range(rounds):
+            self.reset()
+            for field, text in INPUT:
+                for char in text:
+                    self.type_key(field, char)
+            self.press_enter()
+
+    def report(self):
+        report = {}
+        everything = []
+        for name, values in self.samples.items():
+            everything.extend(values)
+            report[name] = self._summary(values)
+        report['all'] = self._summary(everything)
+        return report
+
+    @staticmethod
+    def _summary(values):
+        summary = {'count': len(values)}
+        for p in PERCENTILES:
+            summary['p%s' % p] = percentile(values, p) * 1e3
+        return summary
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog='python -m benchmarks.latency')
+    parser.add_argument('-r', '--rounds', type=int, default=10)
+    parser.add_argument('-b', '--budget', type=float, default=None,
+                        help='Fail if the selected percentile exceeds this many milliseconds')
+    parser.add_argument('-p', '--percentile', type=int, choices=PERCENTILES, default=95,
+                        help='Percentile checked against the budget (default: %(default)s)')
+    parser.add_argument('-o', '--output', help='Write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    harness = LatencyHarness(app)
+    harness.run(args.rounds)
+    report = harness.report()
+
+    print("%-16s %6s %9s %9s %9s" % ('', 'count', 'p50 [ms]', 'p95 [ms]', 'p99 [ms]'))
+    for name, summary in report.items():
+        print("%-16s %6d %9.2f %9.2f %9.2f" % (name, summary['count'], summary['p50'], summary['p95'], summary['p99']))
+    if harness.timeouts:
+        print("%s updates did not happen within %.1fs" % (harness.timeouts, harness.timeout))
+
+    if args.output:
+        with open(args.output, 'w') as o:
+            json.dump(report, o, indent=2)
+
+    key = 'p%s' % args.percentile
+    over_budget = [name for name, summary in report.items() if args.budget is not None and summary[key] > args.budget]
+    if over_budget:
+        print("%s latency over budget of %.2f ms: %s" % (key, args.budget, ', '.join(over_budget)))
+    return 1 if over_budget or harness.timeouts else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
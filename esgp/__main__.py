@@ -14,52 +14,172 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import json
-import logging
-import struct
 import sys
-from argparse import ArgumentParser
 
-import daiquiri
-from PyQt5.QtWidgets import QApplication
+if '--startup-profile' in sys.argv:
+    # installed before anything else is imported so that the whole startup is covered
+    from esgp.profiling import StartupProfile
+    startup_profile = StartupProfile()
+    startup_profile.install()
+else:
+    startup_profile = None
+
+import logging
+from argparse import ArgumentParser
 
 from esgp.config import Configuration
-from esgp.ui import MainWindow
 
 
-def _read_chrome_native_message():
-    text_length_bytes = sys.stdin.buffer.read(4)
-    text_length = struct.unpack("i", text_length_bytes)[0]
-    text_decoded = sys.stdin.buffer.read(text_length)
-    return json.loads(text_decoded)
+def _setup_logging(verbose):
+    if verbose:
+        import daiquiri
+        daiquiri.setup(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.WARNING)
 
 
-if __name__ == "__main__":
+def _relay_native_messages(config):
+    import asyncio
+    from esgp.dispatcher import Dispatcher, default_handlers
+    from esgp.instance import forward
+
+    def activate(domain, url):
+        if not forward(domain, url):
+            raise RuntimeError("The resident instance is not reachable")
+
+    asyncio.run(Dispatcher(default_handlers(config, activate)).serve_stdio())
+    return 0
+
+
+def _native_messaging_closed(app, main_window, resident):
+    if resident:
+        return
+    if main_window.isVisible():
+        app.setQuitOnLastWindowClosed(True)
+    else:
+        app.quit()
+
+
+def run_gui(argv):
     parser = ArgumentParser()
     parser.add_argument('-d', '--domain')
     parser.add_argument('-v', '--verbose', action='store_true', default=False,
                         help='Enable verbose logging (default: %(default)s)')
+    parser.add_argument('--resident', action='store_true', default=False,
+                        help='Keep running in the background and serve later invocations (default: %(default)s)')
+    parser.add_argument('--startup-profile', action='store_true', default=False,
+                        help='Print an import time breakdown and the time to show the window (default: %(default)s)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Record the time spent in UI slots and write it as Chrome trace events to FILE')
+    parser.add_argument('--identicon-cache', action='store_true', default=False,
+                        help='Keep rendered identicons in $XDG_CACHE_HOME/esgp (default: %(default)s)')
     parser.add_argument('arg', nargs='?')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    daiquiri.setup(level=logging.DEBUG if args.verbose else logging.WARNING)
+    _setup_logging(args.verbose)
     logger = logging.getLogger(__file__)
 
+    if args.trace:
+        import atexit
+        from esgp.tracing import Tracer, instrument
+        tracer = Tracer()
+        instrument(tracer)
+        atexit.register(tracer.write, args.trace)
+
     url = None
-    
-    if (args.arg or "").startswith('chrome-extension://'):
+    native_messaging = (args.arg or "").startswith('chrome-extension://')
+
+    if native_messaging:
+        from esgp.nativemessaging import read_message, write_message
         try:
-            # started from chrome extension
-            url = _read_chrome_native_message()['url']
+            # started from chrome extension; read unbuffered, the rest of stdin belongs to the dispatcher
+            url = read_message(sys.stdin.buffer.raw)['url']
         except:
             logger.exception("Failed to communicate with chrome native messaging")
+            native_messaging = False
 
     config = Configuration()
+
+    from esgp.instance import forward
+    if forward(args.domain, url):
+        logger.debug("Handed over to the resident instance")
+        if native_messaging:
+            write_message(sys.stdout.buffer, {'ok': True})
+            # keep the channel open and relay everything else, still without loading Qt
+            config.read()
+            return _relay_native_messages(config)
+        return 0
+
     config.read()
 
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from esgp.ui import MainWindow
+
     app = QApplication(sys.argv)
     main_window = MainWindow(config, url, args)
     main_window.show()
 
-    sys.exit(app.exec_())
+    if args.resident:
+        from esgp.resident import ResidentServer
+        server = ResidentServer(parent=app)
+        if server.listen():
+            server.activated.connect(main_window.activate)
+            app.setQuitOnLastWindowClosed(False)
+
+    if native_messaging:
+        from esgp.resident import NativeMessagingListener
+        listener = NativeMessagingListener(config, app)
+        write_message(sys.stdout.buffer, {'ok': True})
+        listener.activated.connect(main_window.activate)
+        listener.disconnected.connect(lambda: _native_messaging_closed(app, main_window, args.resident))
+        # closing the window must not close the channel while the browser keeps it open
+        app.setQuitOnLastWindowClosed(False)
+        listener.start()
+
+    if startup_profile:
+        startup_profile.mark('window shown')
+        # the first event loop iteration paints the window
+        QTimer.singleShot(0, lambda: (startup_profile.mark('first event loop turn'), startup_profile.report()))
+
+    return app.exec_()
+
+
+def run_generate(argv):
+    _setup_logging(False)
+
+    # imported here to keep the GUI startup path free of the process pool machinery
+    from esgp.batch import main
+    return main(argv)
+
+
+def run_storage_command(command, argv):
+    _setup_logging(False)
+
+    from esgp.storage import main
+    return main(command, argv)
+
+
+def run_import(argv):
+    _setup_logging(False)
+
+    from esgp.importer import main
+    return main(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # PyQt5 must not be imported for any of the headless commands
+    if argv and argv[0] == 'generate':
+        return run_generate(argv[1:])
+    if argv and argv[0] in ('import-ini', 'export-ini'):
+        return run_storage_command(argv[0], argv[1:])
+    if argv and argv[0] == 'import':
+        return run_import(argv[1:])
+    return run_gui(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Headless password generation (``python -m esgp generate``).
+# This module must never import PyQt5 (directly or through esgp.ui).
+import getpass
+import logging
+import os
+from argparse import ArgumentParser, FileType
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from esgp.config import Configuration
+from esgp.domains import domain_from_url
+from esgp.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_pwd = None
+_engines = {}
+
+
+def _init_worker(pwd):
+    global _pwd
+    _pwd = pwd
+    _engines.clear()
+
+
+def _generate(domain, length, digest_name):
+    engine = _engines.get(digest_name)
+    if engine is None:
+        engine = _engines[digest_name] = Engine(_pwd, digest_name)
+    return engine.generate(domain, length)
+
+
+def read_domains(stream):
+    # URLs are reduced to their registrable domain, just like when they are pasted in the GUI
+    for line in stream:
+        domain = line.strip()
+        if domain:
+            yield domain_from_url(domain) or domain
+
+
+def _result(domain, future):
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error("%s: %s", domain, e)
+        return None
+
+
+def generate_passwords(pwd, domains, config, jobs=None):
+    """
+    Yields ``(domain, password)`` tuples in input order. The password is None (and the error
+    is logged) for domains it could not be generated for.
+
+    Work is fanned out to a process pool; at most a few tasks per worker are kept in flight,
+    so the input is consumed as a stream and results are emitted as soon as all preceding
+    domains are done.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(pwd,)) as executor:
+        for domain in domains:
+            length, digest_name = config.get_generation_settings(domain)
+            pending.append((domain, executor.submit(_generate, domain, length, digest_name)))
+
+            while pending and (pending[0][1].done() or len(pending) >= jobs * 4):
+                domain, future = pending.popleft()
+                yield domain, _result(domain, future)
+
+        while pending:
+            domain, future = pending.popleft()
+            yield domain, _result(domain, future)
+
+
+def main(argv):
+    parser = ArgumentParser(prog='esgp generate',
+                            description='Generate passwords for a list of domains (one per line)')
+    parser.add_argument('-i', '--input', type=FileType('r'), default='-',
+                        help='Read domains from this file (default: stdin)')
+    parser.add_argument('-o', '--output', type=FileType('w'), default='-',
+                        help='Write domain<TAB>password lines to this file (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of worker processes (default: number of CPUs)')
+    args = parser.parse_args(argv)
+
+    config = Configuration()
+    config.read()
+
+    pwd = getpass.getpass('Master password: ') + getpass.getpass('Secret password: ')
+    if not pwd:
+        logger.error("No master password given")
+        return 1
+
+    failed = 0
+    for domain, password in generate_passwords(pwd, read_domains(args.input), config, args.jobs):
+        if password is None:
+            failed += 1
+            continue
+        args.output.write("%s\t%s\n" % (domain, password))
+        args.output.flush()
+
+    if failed:
+        logger.error("No password generated for %s domain(s)", failed)
+        return 1
+    return 0
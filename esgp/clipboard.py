@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from esgp.domains import domain_from_url
+
+logger = logging.getLogger(__name__)
+
+
+class _ClassifySignals(QObject):
+    # generation, domain or None
+    finished = pyqtSignal(int, object)
+
+
+class _ClassifyWorker(QRunnable):
+
+    def __init__(self, generation, text):
+        super(_ClassifyWorker, self).__init__()
+        self.generation = generation
+        self.text = text
+        self.signals = _ClassifySignals()
+
+    def run(self):
+        self.signals.finished.emit(self.generation, domain_from_url(self.text))
+
+
+class ClipboardWatcher(QObject):
+    """
+    Keeps a copy of the clipboard text, refreshed on ``QClipboard.dataChanged`` only, and the
+    domain of the URL in it (if any), computed in the background.
+
+    Reading the clipboard is a round trip to the clipboard owner on X11 and Wayland, which
+    must not happen on every keystroke.
+    """
+
+    _UNREAD = object()
+
+    def __init__(self, clipboard, parent=None):
+        super(ClipboardWatcher, self).__init__(parent)
+        self._clipboard = clipboard
+        self._text = self._UNREAD
+        self._domain = None
+        self._classified = False
+        self._generation = 0
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        clipboard.dataChanged.connect(self.clipboard_changed)
+
+    @property
+    def text(self):
+        if self._text is self._UNREAD:
+            # first use; from now on dataChanged keeps us up to date
+            self.clipboard_changed()
+        return self._text
+
+    def clipboard_changed(self):
+        self._text = self._clipboard.text()
+        self._domain = None
+        self._classified = False
+        self._generation += 1
+
+        if self._text:
+            worker = _ClassifyWorker(self._generation, self._text)
+            worker.signals.finished.connect(self.classified)
+            self._pool.start(worker)
+
+    def classified(self, generation, domain):
+        if generation == self._generation:
+            self._domain = domain
+            self._classified = True
+
+    def domain(self, text):
+        """
+        The domain of the URL ``text``; free if ``text`` is the clipboard content and the
+        background classification has finished.
+        """
+        if self._classified and text == self._text:
+            return self._domain
+        return domain_from_url(text)
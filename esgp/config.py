@@ -15,57 +15,158 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-from configparser import ConfigParser
+
+from esgp.domains import DomainIndex, domain_suffixes, normalize_domain
 
 PATH = os.path.abspath(os.path.expanduser("~/.esgp.cfg"))
+DB_PATH = os.path.abspath(os.path.expanduser("~/.esgp.sqlite"))
+
+# configuration value -> hashlib/supergenpass digest name
+ALGORITHMS = {
+    'MD5': 'md5',
+    'SHA': 'sha512',
+}
+
+
+def default_storage():
+    from esgp.storage import IniStorage, SqliteStorage
+
+    if os.path.exists(DB_PATH):
+        return SqliteStorage(DB_PATH)
+    return IniStorage(PATH)
 
 
 class Configuration(object):
     
-    def __init__(self):
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage()
         self.algorithm = 'MD5'
         self.length = 10
-        self.domain_settings = []
-    
+        self.domain_index = DomainIndex()
+        self._domain_settings = []
+        # normalized domains changed since the last read/write, None for "everything"
+        self._changes = set()
+
+    @property
+    def domain_settings(self):
+        if self._domain_settings is None:
+            # lazy storage: only load every domain if someone actually needs all of them
+            self.algorithm, self.length, self._domain_settings = self.storage.load(self.algorithm, self.length)
+            self.reindex()
+            self._changes = set()
+        return self._domain_settings
+
+    @domain_settings.setter
+    def domain_settings(self, value):
+        self._domain_settings = value
+        self.reindex()
+
     def read(self):
-        
-        parser = ConfigParser()
-        parser.read(PATH)
-        
-        if parser.has_section('defaults'):
-            self.algorithm = parser.get('defaults', 'algorithm', fallback=self.algorithm)
-            self.length = int(parser.get('defaults', 'length', fallback=self.length))
-    
-        for section in parser.sections():
-            if section == "defaults":
-                continue
-            
-            self.domain_settings.append({
-                'domain': section,
-                'algorithm': parser.get(section, 'algorithm', fallback=self.algorithm),
-                'length': parser.get(section, 'length', fallback=self.length)
-            })
+        if self.storage.lazy:
+            self.algorithm, self.length = self.storage.load_defaults(self.algorithm, self.length)
+            self._domain_settings = None
+            self.domain_index.clear()
+        else:
+            self.algorithm, self.length, self._domain_settings = self.storage.load(self.algorithm, self.length)
+            self.reindex()
+        self._changes = set()
 
     def write(self):
-        
-        parser = ConfigParser()
-        
-        parser.add_section('defaults')
-        parser.set('defaults', 'algorithm', self.algorithm)
-        parser.set('defaults', 'length', str(self.length))
-
-        for settings in self.domain_settings:
-            domain = settings['domain']
-            if not domain:
-                continue
-            parser.add_section(domain)
-            parser.set(domain, 'algorithm', settings['algorithm'])
-            parser.set(domain, 'length', str(settings['length']))
-        
-        with open(PATH, 'w') as o:
-            parser.write(o)
-    
+        self.save_to(self.storage, self._changes)
+        self._changes = set()
+
+    def save_to(self, storage, changes=None):
+        if storage.lazy and changes is not None and self._domain_settings is not None:
+            # only hand over what changed, the storage can write single rows
+            domain_settings = [s for s in (self.domain_index.get(domain) for domain in changes) if s]
+        elif storage.lazy or self._domain_settings is not None:
+            domain_settings = self._domain_settings
+        else:
+            domain_settings = self.domain_settings
+        storage.save(self.algorithm, self.length, domain_settings, changes)
+
+    def reindex(self):
+        self.domain_index.clear()
+        for settings in self._domain_settings or []:
+            self.domain_index.add(settings)
+        # the list may have been changed behind our back
+        self._changes = None
+
+    def _changed(self, settings):
+        if self._changes is not None:
+            self._changes.add(normalize_domain(settings.get('domain')))
+
+    def insert_domain_settings(self, row, settings):
+        self.domain_settings.insert(row, settings)
+        self.domain_index.add(settings)
+        self._changed(settings)
+
+    def insert_domain_settings_batch(self, row, settings_list):
+        self.domain_settings[row:row] = settings_list
+        for settings in settings_list:
+            self.domain_index.add(settings)
+            self._changed(settings)
+
+    def merge_domain_settings(self, settings_list, overwrite=False):
+        """
+        Appends the settings of domains that have none yet. Existing settings only get the
+        length and algorithm of ``settings_list`` if ``overwrite`` is set.
+        Returns the number of ``(added, updated)`` domains.
+        """
+        # the index only covers every domain once they are loaded
+        self.domain_settings
+
+        added = []
+        updated = 0
+        for settings in settings_list:
+            existing = self.domain_index.get(settings.domain)
+            if existing is None:
+                added.append(settings)
+                self.domain_index.add(settings)
+                self._changed(settings)
+            elif overwrite and (existing.length, existing.algorithm) != (settings.length, settings.algorithm):
+                existing.length = settings.length
+                existing.algorithm = settings.algorithm
+                self._changed(existing)
+                updated += 1
+        self._domain_settings.extend(added)
+        return len(added), updated
+
+    def remove_domain_settings(self, row):
+        settings = self.domain_settings.pop(row)
+        self.domain_index.discard(settings)
+        self._changed(settings)
+        return settings
+
+    def remove_domain_settings_range(self, row, count):
+        removed = self.domain_settings[row:row + count]
+        del self.domain_settings[row:row + count]
+        for settings in removed:
+            self.domain_index.discard(settings)
+            self._changed(settings)
+        return removed
+
+    def update_domain_settings(self, row, key, value):
+        settings = self.domain_settings[row]
+        self._changed(settings)
+        if key == 'domain':
+            self.domain_index.discard(settings)
+            settings[key] = value
+            self.domain_index.add(settings)
+        else:
+            settings[key] = value
+        self._changed(settings)
+
     def get_domain_settings(self, domain):
-        for d in self.domain_settings:
-            if d.get('domain', '') == domain:
-                return d
+        if self._domain_settings is None:
+            return self.storage.lookup(domain_suffixes(domain))
+        return self.domain_index.lookup(domain)
+
+    def get_generation_settings(self, domain):
+        """
+        Returns the ``(length, digest name)`` to generate the password for ``domain`` with.
+        """
+        settings = self.get_domain_settings(domain)
+        if settings:
+            return int(settings['length']), ALGORITHMS[settings['algorithm'].upper()]
+        return int(self.length), ALGORITHMS[self.algorithm.upper()]
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Persistent identicon cache (``--identicon-cache``), one file under $XDG_CACHE_HOME/esgp:
+#
+#   header:  magic (8 bytes), number of slots (uint32), used slots (uint32),
+#            end of the data (uint64)
+#   slots:   key (32 bytes), data offset (uint64), data length (uint32), width (uint16),
+#            height (uint16), last use (double)
+#   data:    raw RGBA pixels, appended behind the slots
+#
+# The slots are an open addressing hash table (linear probing, an all-zero key marks a free
+# slot) that is memory-mapped, so a lookup is a probe in the mapping plus one pread().
+# Keys are the SHA-256 of the identicon digest (five rounds of hashing of the passwords),
+# the algorithm and the image size; nothing that could be reversed.
+#
+# Writers append the pixels first and publish the slot afterwards, holding flock(LOCK_EX);
+# readers hold LOCK_SH. Once the data outgrows ``max_size`` or the table is 3/4 full, the
+# most recently used half is copied into a new file that replaces the old one.
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ESGPIDC1'
+HEADER = struct.Struct('<8sIIQ')
+SLOT = struct.Struct('<32sQIHHd')
+
+EMPTY_KEY = bytes(32)
+
+
+def default_path():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'esgp', 'identicons.cache')
+
+
+def cache_key(digest, digest_name, width, height):
+    return hashlib.sha256(('%s:%s:%dx%d' % (digest, digest_name, width, height)).encode('ascii')).digest()
+
+
+class DiskIdenticonCache(object):
+    """
+    Memory-mapped on-disk cache of rendered identicons, shared by all esgp processes of a user.
+
+    ``get()`` returns the raw RGBA pixels of an identicon, ``put()`` stores them. Errors are
+    logged and treated as cache misses. Opened lazily, from whichever thread uses it first.
+    """
+
+    def __init__(self, path=None, slots=1024, max_size=8 * 1024 * 1024):
+        self.path = path or default_path()
+        self.slots = slots
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._fd = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _index_size(self, slots):
+        return HEADER.size + slots * SLOT.size
+
+    def _create(self, path, slots):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.identicons-')
+        try:
+            os.ftruncate(fd, self._index_size(slots))
+            os.pwrite(fd, HEADER.pack(MAGIC, slots, 0, self._index_size(slots)), 0)
+            os.fsync(fd)
+            os.close(fd)
+        except BaseException:
+            os.close(fd)
+            os.unlink(tmp_path)
+            raise
+        return tmp_path
+
+    def _open(self):
+        if self._fd is not None and os.path.exists(self.path) and \
+                os.fstat(self._fd).st_ino == os.stat(self.path).st_ino:
+            return
+        # first use, or another process replaced the file while compacting
+        self.close()
+
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        if not os.path.exists(self.path):
+            os.replace(self._create(self.path, self.slots), self.path)
+
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            magic, slots, _, _ = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+            if magic != MAGIC or os.fstat(fd).st_size < self._index_size(slots):
+                raise ValueError("%s is not an identicon cache" % self.path)
+            self._index = mmap.mmap(fd, self._index_size(slots))
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def close(self):
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _header(self):
+        return HEADER.unpack_from(self._index, 0)
+
+    def _slot_count(self):
+        return self._header()[1]
+
+    def _find(self, key):
+        """
+        Returns the index of the slot holding ``key`` or of the free slot it would go into.
+        """
+        slots = self._slot_count()
+        start = int.from_bytes(key[:4], 'little') % slots
+        for i in range(slots):
+            slot = (start + i) % slots
+            slot_key = self._index[HEADER.size + slot * SLOT.size:HEADER.size + slot * SLOT.size + 32]
+            if slot_key == key or slot_key == EMPTY_KEY:
+                return slot
+        return None
+
+    def _read_slot(self, slot):
+        return SLOT.unpack_from(self._index, HEADER.size + slot * SLOT.size)
+
+    def get(self, key):
+        """
+        Returns ``(width, height, pixels)`` or None.
+        """
+        with self._lock:
+            try:
+                self._open()
+                fcntl.flock(self._fd, fcntl.LOCK_SH)
+                try:
+                    found = self._get(key)
+                finally:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+            except (OSError, ValueError) as e:
+                logger.debug("Identicon disk cache unavailable: %s", e)
+                found = None
+
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return found
+
+    def _get(self, key):
+        slot = self._find(key)
+        if slot is None:
+            return None
+        slot_key, offset, length, width, height, _ = self._read_slot(slot)
+        if slot_key != key or offset + length > self._header()[3]:
+            return None
+
+        pixels = os.pread(self._fd, length, offset)
+        if len(pixels) != length:
+            return None
+        # an 8 byte write; racing readers see either timestamp
+        struct.pack_into('<d', self._index, HEADER.size + slot * SLOT.size + SLOT.size - 8, time.time())
+        return width, height, pixels
+
+    def put(self, key, width, height, pixels):
+        with self._lock:
+            try:
+                self._open()
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+                try:
+                    self._open_if_replaced()
+                    self._put(key, width, height, pixels)
+                finally:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+            except (OSError, ValueError) as e:
+                logger.debug("Identicon disk cache unavailable: %s", e)
+
+    def _open_if_replaced(self):
+        # the file may have been compacted between _open() and getting the lock
+        if os.fstat(self._fd).st_ino != os.stat(self.path).st_ino:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def _put(self, key, width, height, pixels):
+        magic, slots, used, end = self._header()
+        if end + len(pixels) > self._index_size(slots) + self.max_size or (used + 1) * 4 > slots * 3:
+            self._compact()
+            magic, slots, used, end = self._header()
+
+        slot = self._find(key)
+        if slot is None:
+            return
+        if self._read_slot(slot)[0] == key:
+            return
+
+        os.pwrite(self._fd, pixels, end)
+        struct.pack_into(SLOT.format, self._index, HEADER.size + slot * SLOT.size,
+                         key, end, len(pixels), width, height, time.time())
+        HEADER.pack_into(self._index, 0, magic, slots, used + 1, end + len(pixels))
+
+    def _compact(self):
+        _, slots, used, _ = self._header()
+        entries = [self._read_slot(slot) for slot in range(slots)]
+        entries = sorted((e for e in entries if e[0] != EMPTY_KEY), key=lambda e: e[5], reverse=True)
+
+        tmp_path = self._create(self.path, self.slots)
+        try:
+            fd = os.open(tmp_path, os.O_RDWR)
+            try:
+                index = mmap.mmap(fd, self._index_size(self.slots))
+                try:
+                    kept, new_end = self._copy_entries(entries, fd, index)
+                    HEADER.pack_into(index, 0, MAGIC, self.slots, kept, new_end)
+                    index.flush()
+                finally:
+                    index.close()
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        logger.debug("Compacted the identicon disk cache: kept %s of %s identicons", kept, used)
+        # the lock is held on the old file, which nobody can find anymore
+        old_fd = self._fd
+        self._fd = None
+        self._index.close()
+        self._index = None
+        self._open()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        os.close(old_fd)
+
+    def _copy_entries(self, entries, fd, index):
+        end = self._index_size(self.slots)
+        size = 0
+        kept = 0
+        for key, offset, length, width, height, last_used in entries:
+            if size + length > self.max_size // 2 or kept >= self.slots // 2:
+                break
+            pixels = os.pread(self._fd, length, offset)
+            os.pwrite(fd, pixels, end)
+
+            slot = int.from_bytes(key[:4], 'little') % self.slots
+            while index[HEADER.size + slot * SLOT.size:HEADER.size + slot * SLOT.size + 32] != EMPTY_KEY:
+                slot = (slot + 1) % self.slots
+            struct.pack_into(SLOT.format, index, HEADER.size + slot * SLOT.size,
+                             key, end, length, width, height, last_used)
+
+            end += length
+            size += length
+            kept += 1
+        return kept, end
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import itertools
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+
+from esgp.domains import domain_from_url
+from esgp.nativemessaging import HEADER, NativeMessagingError, decode_header, encode_message
+
+logger = logging.getLogger(__name__)
+
+# upper bound for the bytes merged into one write to stdout
+MAX_WRITE_SIZE = 64 * 1024
+
+
+class Dispatcher(object):
+    """
+    Concurrent native messaging dispatcher.
+
+    Requests are read from ``reader`` into a bounded queue (which stops reading from the
+    browser when the workers fall behind), processed by ``concurrency`` workers and written
+    back as soon as they are done, tagged with the request's ``id``. Replies that are ready
+    at the same time are coalesced into a single write.
+
+    ``handlers`` maps an ``action`` to a callable taking the request and returning the reply.
+    Plain functions run in the default executor, coroutine functions on the event loop.
+    """
+
+    def __init__(self, handlers, concurrency=8, queue_size=256):
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._ids = itertools.count(1)
+
+    async def serve(self, reader, writer):
+        requests = asyncio.Queue(self.queue_size)
+        replies = asyncio.Queue(self.queue_size)
+
+        workers = [asyncio.ensure_future(self._work(requests, replies)) for _ in range(self.concurrency)]
+        writer_task = asyncio.ensure_future(self._write(replies, writer))
+
+        try:
+            await self._read(reader, requests)
+        finally:
+            for _ in workers:
+                await requests.put(None)
+            await asyncio.gather(*workers)
+            await replies.put(None)
+            await writer_task
+
+    async def serve_stdio(self):
+        loop = asyncio.get_event_loop()
+
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout.buffer)
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+
+        await self.serve(reader, writer)
+
+    async def _read(self, reader, requests):
+        while True:
+            try:
+                header = await reader.readexactly(HEADER.size)
+                data = await reader.readexactly(decode_header(header))
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    logger.error("Native messaging channel closed in the middle of a message")
+                return
+            except NativeMessagingError as e:
+                logger.error("Closing native messaging channel: %s", e)
+                return
+
+            await requests.put(data)
+
+    async def _work(self, requests, replies):
+        while True:
+            data = await requests.get()
+            if data is None:
+                return
+            await replies.put(await self.dispatch(data))
+
+    async def dispatch(self, data):
+        request_id = None
+        try:
+            request = json.loads(data.decode('utf-8'))
+            if not isinstance(request, dict):
+                raise ValueError("Request is not an object")
+            request_id = request.get('id')
+            if request_id is None:
+                request_id = next(self._ids)
+
+            # messages without an action are the plain {"url": ...} requests of the extension
+            action = request.get('action') or ('show' if 'url' in request else None)
+            handler = self.handlers.get(action)
+            if handler is None:
+                raise ValueError("Unsupported action: %s" % action)
+
+            if asyncio.iscoroutinefunction(handler):
+                reply = await handler(request)
+            else:
+                reply = await asyncio.get_event_loop().run_in_executor(None, handler, request)
+            reply = dict(reply or {}, ok=True)
+        except Exception as e:
+            logger.debug("Request %s failed", request_id, exc_info=True)
+            reply = {'ok': False, 'error': str(e)}
+
+        reply['id'] = request_id
+        try:
+            return encode_message(reply)
+        except NativeMessagingError as e:
+            return encode_message({'id': request_id, 'ok': False, 'error': str(e)})
+
+    async def _write(self, replies, writer):
+        done = False
+        while not done:
+            frame = await replies.get()
+            if frame is None:
+                break
+
+            frames = [frame]
+            size = len(frame)
+            while size < MAX_WRITE_SIZE and not replies.empty():
+                frame = replies.get_nowait()
+                if frame is None:
+                    done = True
+                    break
+                frames.append(frame)
+                size += len(frame)
+
+            writer.write(b''.join(frames))
+            await writer.drain()
+
+
+def default_handlers(config, activate=None, cache=None):
+    """
+    Handlers for the ``lookup`` and ``generate`` actions and, if ``activate(domain, url)``
+    is given, for ``show``. ``activate`` is called from a worker thread.
+
+    Generated passwords are kept in ``cache`` (a new ``PasswordCache`` if not given) for
+    as long as the channel stays open.
+    """
+    if cache is None:
+        from esgp.pwcache import PasswordCache
+        cache = PasswordCache()
+
+    def request_domain(request):
+        domain = request.get('domain') or domain_from_url(request.get('url'))
+        if not domain:
+            raise ValueError("Request has neither a domain nor a URL")
+        return domain
+
+    def lookup(request):
+        domain = request_domain(request)
+        settings = config.get_domain_settings(domain)
+        length, digest_name = config.get_generation_settings(domain)
+        return {
+            'domain': settings['domain'] if settings else domain,
+            'length': length,
+            'algorithm': digest_name,
+        }
+
+    def generate(request):
+        from esgp.engine import DIGESTS, MIN_LENGTH
+
+        domain = request_domain(request)
+        length, digest_name = config.get_generation_settings(domain)
+        length = request.get('length') or length
+        digest_name = request.get('algorithm') or digest_name
+        if isinstance(length, str) and length.isdigit():
+            length = int(length)
+        # not isinstance(): True and False are ints as well
+        if type(length) is not int or length < MIN_LENGTH:
+            raise ValueError("length must be an integer of at least %s" % MIN_LENGTH)
+        if digest_name not in DIGESTS:
+            raise ValueError("algorithm must be one of %s" % ', '.join(sorted(DIGESTS)))
+        if not isinstance(request.get('password'), str):
+            raise ValueError("Request has no password")
+        return {
+            'domain': domain,
+            'password': cache.generate(request['password'], domain, length, digest_name),
+        }
+
+    handlers = {
+        'lookup': lookup,
+        'generate': generate,
+    }
+
+    if activate is not None:
+        def show(request):
+            activate(request.get('domain'), request.get('url'))
+            return {}
+        handlers['show'] = show
+
+    return handlers
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog='python -m esgp.dispatcher',
+                            description='Serve lookup/generate native messaging requests on stdin/stdout')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-q', '--queue-size', type=int, default=256)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    from esgp.config import Configuration
+    config = Configuration()
+    config.read()
+
+    dispatcher = Dispatcher(default_handlers(config), args.concurrency, args.queue_size)
+    asyncio.run(dispatcher.serve_stdio())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import ipaddress
+from urllib.parse import urlsplit
+
+
+def registrable_domain(host):
+    """
+    Reduces ``host`` to its registrable domain (eTLD+1) if the compiled public suffix list
+    is available. IP addresses and public suffixes are returned unchanged.
+    """
+    from esgp.psl import default_list
+
+    host = host.lower().rstrip('.')
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+
+    psl = default_list()
+    if psl is None:
+        return host
+    return psl.registrable_domain(host) or host
+
+
+def domain_from_url(text):
+    """
+    Returns the registrable domain of the URL ``text`` (without credentials or port), or None
+    if ``text`` is not a URL.
+    """
+    text = (text or '').strip()
+    try:
+        chunks = urlsplit(text)
+        host = chunks.hostname
+    except ValueError:
+        return None
+
+    if not chunks.netloc or chunks.netloc == text or not host:
+        return None
+    return registrable_domain(host)
+
+
+def normalize_domain(domain):
+    return (domain or '').strip().rstrip('.').lower()
+
+
+class DomainSettings(object):
+    """
+    Settings of one domain. Slotted to keep 100k of them small; supports the mapping-style
+    access (``settings['length']``, ``settings.get('domain')``) the settings dicts had.
+    """
+
+    __slots__ = ('domain', 'algorithm', 'length')
+
+    def __init__(self, domain='', algorithm='MD5', length=10):
+        self.domain = domain
+        self.algorithm = algorithm
+        self.length = length
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __repr__(self):
+        return 'DomainSettings(%r, %r, %r)' % (self.domain, self.algorithm, self.length)
+
+
+def domain_suffixes(domain):
+    """
+    ``'mail.example.com'`` -> ``['mail.example.com', 'example.com', 'com']``
+    """
+    labels = normalize_domain(domain).split('.')
+    return ['.'.join(labels[i:]) for i in range(len(labels)) if labels[i]]
+
+
+class DomainIndex(object):
+    """
+    Hash index over the per-domain settings plus a trie of reversed domain labels.
+
+    ``lookup('mail.example.co.uk')`` walks ``uk -> co -> example -> mail`` and returns the
+    settings of the most specific configured domain on that path.
+    """
+
+    _SETTINGS = None  # trie key holding the settings of a node; never a valid label
+
+    def __init__(self):
+        self._domains = {}
+        self._trie = {}
+
+    def __len__(self):
+        return len(self._domains)
+
+    def clear(self):
+        self._domains.clear()
+        self._trie.clear()
+
+    def add(self, settings):
+        domain = normalize_domain(settings.get('domain'))
+        if not domain:
+            return
+        entries = self._domains.setdefault(domain, [])
+        entries.append(settings)
+        if len(entries) == 1:
+            self._node(domain, create=True)[self._SETTINGS] = settings
+
+    def discard(self, settings):
+        domain = normalize_domain(settings.get('domain'))
+        entries = self._domains.get(domain)
+        if not entries:
+            return
+        for i, entry in enumerate(entries):
+            if entry is settings:
+                del entries[i]
+                break
+        else:
+            return
+
+        if entries:
+            self._node(domain)[self._SETTINGS] = entries[0]
+        else:
+            del self._domains[domain]
+            self._prune(domain)
+
+    def get(self, domain):
+        entries = self._domains.get(normalize_domain(domain))
+        return entries[0] if entries else None
+
+    def lookup(self, domain):
+        domain = normalize_domain(domain)
+        entries = self._domains.get(domain)
+        if entries:
+            return entries[0]
+
+        found = None
+        node = self._trie
+        for label in reversed(domain.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(self._SETTINGS, found)
+        return found
+
+    def _node(self, domain, create=False):
+        node = self._trie
+        for label in reversed(domain.split('.')):
+            if create:
+                node = node.setdefault(label, {})
+            else:
+                node = node[label]
+        return node
+
+    def _prune(self, domain):
+        path = [self._trie]
+        labels = list(reversed(domain.split('.')))
+        for label in labels:
+            path.append(path[-1][label])
+        path[-1].pop(self._SETTINGS, None)
+
+        for label, parent, node in zip(reversed(labels), reversed(path[:-1]), reversed(path[1:])):
+            if node:
+                break
+            del parent[label]
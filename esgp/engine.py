@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# SuperGenPass implementation producing the same output as ``supergenpass.generate``.
+# Round-to-round data stays in bytes and the hash state after ``<master password>:`` is
+# kept, so generating many domains under one master password only hashes the domain
+# part of the first round.
+import hashlib
+import re
+from base64 import b64encode
+
+DIGESTS = {
+    'md5': hashlib.md5,
+    'sha512': hashlib.sha512,
+}
+
+ROUNDS = 10
+
+# shorter passwords are rejected: below 3 characters none can ever be valid, so the
+# rounds would never end. Longer ones are cut from the encoded digest like upstream does,
+# which caps them at 24 (md5) or 88 (sha512) characters.
+MIN_LENGTH = 4
+
+_ALTCHARS = b'98'
+_STARTS_LOWER = re.compile(b'[a-z]')
+_UPPER = re.compile(b'[A-Z]')
+_DIGIT = re.compile(b'[0-9]')
+
+
+def _is_valid(pwd):
+    return bool(_STARTS_LOWER.match(pwd) and _UPPER.search(pwd) and _DIGIT.search(pwd))
+
+
+class Engine(object):
+    """
+    Generates SuperGenPass passwords for one master password and digest.
+
+    ``pwd`` may be a str or any bytes-like object (it is only fed into the hash once).
+    """
+
+    def __init__(self, pwd, digest_name='md5'):
+        self.digest = DIGESTS[digest_name]
+        if isinstance(pwd, str):
+            pwd = pwd.encode('utf-8')
+        self._prefix = self.digest(pwd)
+        self._prefix.update(b':')
+
+    def generate(self, domain, length=10):
+        if length < MIN_LENGTH:
+            raise ValueError("Password length must be at least %s, not %s" % (MIN_LENGTH, length))
+        digest = self.digest
+
+        h = self._prefix.copy()
+        h.update(domain.encode('utf-8'))
+        data = b64encode(h.digest(), _ALTCHARS).replace(b'=', b'A')
+
+        i = 1
+        while i < ROUNDS or not _is_valid(data[:length]):
+            data = b64encode(digest(data).digest(), _ALTCHARS).replace(b'=', b'A')
+            i += 1
+
+        return data[:length].decode('ascii')
+
+
+def generate(pwd, domain, length=10, digest_name='md5'):
+    return Engine(pwd, digest_name).generate(domain, length)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import hashlib
+from binascii import hexlify
+from collections import OrderedDict
+from io import BytesIO
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from esgp.secret import wipe
+
+DIGESTS = {
+    'md5': hashlib.md5,
+    'sha512': hashlib.sha512,
+}
+
+ROUNDS = 5
+
+
+def identicon_digest(pwd, digest_name):
+    """
+    ``ROUNDS`` times the hex digest of the previous round, starting with ``pwd`` (a str or
+    bytes-like). The rounds are chained as ASCII hex bytes, which hash exactly like the
+    hexdigest() strings the identicons have always been derived from.
+    """
+    digest = DIGESTS[digest_name]
+    s = pwd.encode('utf-8') if isinstance(pwd, str) else pwd
+    for i in range(0, ROUNDS):
+        s = hexlify(digest(s).digest())
+    return s.decode('ascii')
+
+
+def render_identicon(s, size=16):
+    from pydenticon5 import Pydenticon5
+
+    # QImage (unlike QPixmap) may be created outside of the GUI thread
+    img = QImage()
+    identicon = Pydenticon5().draw(s, size)
+    img_bytes = BytesIO()
+    identicon.save(img_bytes, 'PNG')
+    img.loadFromData(img_bytes.getvalue())
+    return img
+
+
+def draw_identicon(s, size):
+    """
+    Returns ``(width, height, RGBA bytes)`` of the identicon for the digest ``s``, the form
+    ``DiskIdenticonCache`` stores them in.
+    """
+    from pydenticon5 import Pydenticon5
+
+    identicon = Pydenticon5().draw(s, size).convert('RGBA')
+    width, height = identicon.size
+    return width, height, identicon.tobytes('raw', 'RGBA')
+
+
+def image_from_rgba(width, height, data):
+    # copy() detaches the image from ``data``, which is freed when we return
+    return QImage(data, width, height, width * 4, QImage.Format_RGBA8888).copy()
+
+
+class IdenticonSignals(QObject):
+    # generation, (digest, algorithm), QImage or None if the key is already cached
+    finished = pyqtSignal(int, object, object)
+
+
+class IdenticonWorker(QRunnable):
+    """
+    Computes the identicon digest and draws the identicon in a thread pool.
+
+    Only the finished image is handed back through ``signals.finished``; the receiver
+    compares ``generation`` with its own counter to drop stale results. ``pwd`` is wiped
+    once it has been hashed if it is a bytearray.
+
+    Identicons missing from ``cache`` are looked up in ``disk_cache`` (a
+    ``DiskIdenticonCache``), if given, before they are drawn.
+    """
+
+    def __init__(self, generation, pwd, digest_name, cache, size=16, disk_cache=None):
+        super(IdenticonWorker, self).__init__()
+        self.generation = generation
+        self.pwd = pwd
+        self.digest_name = digest_name
+        self.cache = cache
+        self.size = size
+        self.disk_cache = disk_cache
+        self.signals = IdenticonSignals()
+
+    def run(self):
+        try:
+            key = (identicon_digest(self.pwd, self.digest_name), self.digest_name)
+        finally:
+            if isinstance(self.pwd, bytearray):
+                wipe(self.pwd)
+        # the cache is owned by the GUI thread; a plain membership test is safe here
+        # and avoids drawing identicons we already have a pixmap for
+        img = None if key in self.cache else self.render(key[0])
+        self.signals.finished.emit(self.generation, key, img)
+
+    def render(self, s):
+        if self.disk_cache is None:
+            return render_identicon(s, self.size)
+
+        from esgp.diskcache import cache_key
+
+        disk_key = cache_key(s, self.digest_name, self.size, self.size)
+        found = self.disk_cache.get(disk_key)
+        if found is None:
+            found = draw_identicon(s, self.size)
+            self.disk_cache.put(disk_key, *found)
+        return image_from_rgba(*found)
+
+
+class IdenticonCache(object):
+    """
+    Size-limited LRU cache for rendered identicons, keyed by (digest, algorithm).
+    """
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._items),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Bulk import of domains from CSV and JSON lines files (``python -m esgp import``).
+# This module must never import PyQt5.
+import csv
+import io
+import json
+import logging
+import os
+import sys
+from argparse import ArgumentParser
+
+from esgp.domains import DomainSettings, domain_from_url, normalize_domain
+from esgp.engine import MIN_LENGTH
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'jsonl')
+
+# lower-cased column names holding the site, in order of preference. Covers our own
+# domain,length,algorithm files and the exports of Chrome, Firefox, Bitwarden, KeePassXC,
+# LastPass and 1Password. Password columns are never looked at.
+URL_FIELDS = ('domain', 'url', 'login_uri', 'origin', 'hostname', 'website', 'uri')
+
+ALGORITHM_NAMES = {
+    'md5': 'MD5',
+    'sha': 'SHA',
+    'sha512': 'SHA',
+}
+
+# android://<hash>@com.example.app/ and the like are not web sites
+SCHEMES = ('http', 'https')
+
+BATCH_SIZE = 1000
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension == '.json':
+        # a single document like Bitwarden's {"items": [...]} cannot be streamed line by line
+        raise ImportFormatError("JSON documents are not supported, use a CSV or JSON lines export")
+    return 'csv'
+
+
+def _parse_length(value):
+    try:
+        length = int(value)
+    except (TypeError, ValueError):
+        return None
+    return length if length >= MIN_LENGTH else None
+
+
+def _csv_records(stream):
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    columns = {}
+    for i, name in enumerate(header):
+        columns.setdefault(name.strip().lower(), i)
+    site = next((columns[field] for field in URL_FIELDS if field in columns), None)
+    if site is None:
+        raise ImportFormatError("No URL or domain column in %s" % ', '.join(header))
+    length = columns.get('length')
+    algorithm = columns.get('algorithm')
+
+    for row in reader:
+        yield (row[site] if site < len(row) else None,
+               row[length] if length is not None and length < len(row) else None,
+               row[algorithm] if algorithm is not None and algorithm < len(row) else None)
+
+
+def _jsonl_records(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ImportFormatError("Line %s: %s" % (number, e))
+        if not isinstance(record, dict):
+            yield None, None, None
+            continue
+
+        fields = {key.lower(): value for key, value in record.items() if isinstance(key, str)}
+        site = next((fields[field] for field in URL_FIELDS if isinstance(fields.get(field), str)), None)
+        yield site, fields.get('length'), fields.get('algorithm')
+
+
+class Importer(object):
+    """
+    Streams domains out of an export and turns them into ``DomainSettings``.
+
+    URLs are reduced to their registrable domain just like pasted ones; plain domains are
+    taken as they are. Every domain is only yielded once per import. Length and algorithm
+    columns are used where present, the defaults otherwise.
+
+    ``batches()`` does not touch the configuration and may run in another thread;
+    ``run()`` merges the batches into the configuration. Storages that write single rows
+    (SQLite) get every batch committed, the others are written once at the end.
+    """
+
+    def __init__(self, algorithm='MD5', length=10, batch_size=BATCH_SIZE):
+        self.algorithm = algorithm
+        self.length = length
+        self.batch_size = batch_size
+        self.read = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.added = 0
+        self.updated = 0
+        self.existing = 0
+        self._seen = set()
+
+    def settings(self, stream, format):
+        records = _jsonl_records(stream) if format == 'jsonl' else _csv_records(stream)
+        for site, length, algorithm in records:
+            self.read += 1
+
+            site = site.strip() if isinstance(site, str) else ''
+            if '://' in site and site.split('://', 1)[0].lower() not in SCHEMES:
+                self.skipped += 1
+                continue
+            domain = domain_from_url(site) or normalize_domain(site)
+            if not domain or any(c.isspace() or c == '/' or not c.isprintable() for c in domain):
+                self.skipped += 1
+                continue
+            if domain in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(domain)
+
+            yield DomainSettings(domain,
+                                 ALGORITHM_NAMES.get(str(algorithm or '').lower(), self.algorithm),
+                                 _parse_length(length) or self.length)
+
+    def batches(self, path, format=None, progress=None):
+        """
+        Yields lists of up to ``batch_size`` settings read from ``path`` ('-' for stdin).
+        ``progress(position, size)`` is called after every batch; ``size`` is None if unknown.
+        """
+        format = format or guess_format(path)
+        binary = os.fdopen(sys.stdin.fileno(), 'rb', closefd=False) if path == '-' else open(path, 'rb')
+        try:
+            try:
+                size = os.fstat(binary.fileno()).st_size or None
+            except (OSError, io.UnsupportedOperation):
+                size = None
+            # utf-8-sig: spreadsheet applications like to prepend a BOM
+            stream = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+            batch = []
+            try:
+                for settings in self.settings(stream, format):
+                    batch.append(settings)
+                    if len(batch) >= self.batch_size:
+                        yield batch
+                        batch = []
+                        if progress:
+                            progress(self._position(binary), size)
+            except UnicodeDecodeError as e:
+                raise ImportFormatError("Not a UTF-8 file: %s" % e)
+            except csv.Error as e:
+                raise ImportFormatError("Invalid CSV: %s" % e)
+            if batch:
+                yield batch
+            if progress:
+                progress(size or self._position(binary), size)
+        finally:
+            binary.close()
+
+    @staticmethod
+    def _position(binary):
+        try:
+            return binary.tell()
+        except (OSError, io.UnsupportedOperation):
+            return 0
+
+    def merged(self, batch, added, updated):
+        self.added += added
+        self.updated += updated
+        self.existing += len(batch) - added - updated
+
+    def run(self, config, path, format=None, overwrite=False, progress=None):
+        for batch in self.batches(path, format, progress):
+            self.merged(batch, *config.merge_domain_settings(batch, overwrite))
+            if config.storage.lazy:
+                config.write()
+        if not config.storage.lazy:
+            # every write rewrites the whole INI file
+            config.write()
+        return self.stats()
+
+    def stats(self):
+        return {
+            'read': self.read,
+            'added': self.added,
+            'updated': self.updated,
+            'existing': self.existing,
+            'duplicates': self.duplicates,
+            'skipped': self.skipped,
+        }
+
+
+SUMMARY = "%(read)s entries read: %(added)s domains added, %(updated)s updated, " \
+          "%(existing)s already configured, %(duplicates)s duplicates, %(skipped)s skipped"
+
+
+def main(argv):
+    from esgp.config import Configuration
+
+    parser = ArgumentParser(prog='esgp import',
+                            description='Import domains from a CSV, JSON lines or browser password export. '
+                                        'Passwords in the file are ignored.')
+    parser.add_argument('path', help="File to import ('-' for stdin)")
+    parser.add_argument('-f', '--format', choices=FORMATS,
+                        help='File format (default: guessed from the file name, CSV otherwise)')
+    parser.add_argument('--overwrite', action='store_true', default=False,
+                        help='Replace length and algorithm of domains that already have settings '
+                             '(default: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='Domains written per batch (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    config = Configuration()
+    config.read()
+
+    def progress(position, size):
+        if size:
+            sys.stderr.write("\r%3d%%" % (100 * position // size))
+            sys.stderr.flush()
+
+    importer = Importer(config.algorithm, config.length, args.batch_size)
+    try:
+        stats = importer.run(config, args.path, args.format, args.overwrite,
+                             progress if sys.stderr.isatty() else None)
+    except (OSError, ImportFormatError) as e:
+        logger.error("Import failed: %s", e)
+        return 1
+    finally:
+        if sys.stderr.isatty():
+            sys.stderr.write("\n")
+
+    print(SUMMARY % stats)
+    return 0
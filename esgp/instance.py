@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+import socket
+import stat
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+ACK = b'ok\n'
+
+
+def is_private(path, kind=stat.S_ISSOCK):
+    """
+    Whether ``path`` is of ``kind`` (not a symlink), owned by us and inaccessible to anyone else.
+    """
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    return kind(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+
+def runtime_dir():
+    """
+    $XDG_RUNTIME_DIR, or a private directory in /tmp if it is not set. Raises PermissionError
+    if the directory can be used by other users.
+    """
+    path = os.environ.get('XDG_RUNTIME_DIR')
+    if not path:
+        # the temp directory itself is writable by everybody
+        path = os.path.join(tempfile.gettempdir(), 'esgp-%s' % os.getuid())
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+
+    if not is_private(path, stat.S_ISDIR):
+        raise PermissionError("%s is not a private directory" % path)
+    return path
+
+
+def socket_path():
+    return os.path.join(runtime_dir(), 'esgp-%s.sock' % os.getuid())
+
+
+def is_stale(path):
+    """
+    Whether nobody accepts connections on the socket ``path`` anymore.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        return True
+    return False
+
+
+def encode_request(domain=None, url=None):
+    return json.dumps({'domain': domain, 'url': url}).encode('utf-8') + b'\n'
+
+
+def decode_request(line):
+    request = json.loads(line.decode('utf-8'))
+    return request.get('domain'), request.get('url')
+
+
+def forward(domain=None, url=None, path=None, timeout=1.0):
+    """
+    Hands ``domain``/``url`` to a resident instance listening on ``path``.
+
+    Returns True if the resident instance acknowledged the request. This is on the startup
+    path of every invocation and therefore must not import anything from PyQt5.
+    """
+    try:
+        path = path or socket_path()
+    except OSError as e:
+        logger.warning("Not looking for a resident instance: %s", e)
+        return False
+    if not os.path.exists(path):
+        return False
+    if not is_private(path):
+        logger.warning("Ignoring %s: not a socket that only we have access to", path)
+        return False
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(encode_request(domain, url))
+            ack = sock.recv(len(ACK))
+    except OSError as e:
+        logger.debug("No resident instance at %s: %s", path, e)
+        return False
+
+    return ack == ACK
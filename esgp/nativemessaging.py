@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+# see https://developer.chrome.com/docs/extensions/develop/concepts/native-messaging
+HEADER = struct.Struct('=I')  # 32 bit length in native byte order
+MAX_HOST_MESSAGE_SIZE = 1024 * 1024  # host -> browser
+MAX_BROWSER_MESSAGE_SIZE = 4 * 1024 * 1024 * 1024 - 1  # browser -> host (largest 32 bit length)
+
+
+class NativeMessagingError(Exception):
+    pass
+
+
+def decode_header(header):
+    length = HEADER.unpack(header)[0]
+    if length > MAX_BROWSER_MESSAGE_SIZE:
+        raise NativeMessagingError("Message of %s bytes exceeds the limit of %s bytes" % (length, MAX_BROWSER_MESSAGE_SIZE))
+    return length
+
+
+def encode_message(message):
+    data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    if len(data) > MAX_HOST_MESSAGE_SIZE:
+        raise NativeMessagingError("Reply of %s bytes exceeds the limit of %s bytes" % (len(data), MAX_HOST_MESSAGE_SIZE))
+    return HEADER.pack(len(data)) + data
+
+
+def _read_exactly(stream, length):
+    chunks = []
+    while length:
+        chunk = stream.read(length)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b''.join(chunks), length
+
+
+def read_message(stream):
+    """
+    Reads one length-prefixed JSON message from ``stream``. Returns None when the browser
+    closed the channel before a new message started.
+    """
+    header, missing = _read_exactly(stream, HEADER.size)
+    if missing == HEADER.size:
+        return None
+    if missing:
+        raise NativeMessagingError("Truncated message header")
+
+    data, missing = _read_exactly(stream, decode_header(header))
+    if missing:
+        raise NativeMessagingError("Truncated message (%s bytes missing)" % missing)
+    return json.loads(data.decode('utf-8'))
+
+
+def write_message(stream, message):
+    stream.write(encode_message(message))
+    stream.flush()
+
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Stand-in for the browser side of the native messaging channel. It starts a host command,
+# fires framed requests at it and checks that every request gets exactly one reply, e.g.
+#
+#   python -m esgp.nmclient -n 5000 --action lookup
+import asyncio
+import json
+import sys
+import time
+from argparse import ArgumentParser
+
+from esgp.nativemessaging import HEADER, encode_message
+
+
+class StandInClient(object):
+
+    def __init__(self, command):
+        self.command = command
+
+    async def run(self, requests):
+        """
+        Sends ``requests`` (each gets a unique ``id``) and returns the replies in the order
+        they arrived.
+        """
+        process = await asyncio.create_subprocess_exec(*self.command, stdin=asyncio.subprocess.PIPE,
+                                                       stdout=asyncio.subprocess.PIPE)
+
+        async def send():
+            for i, request in enumerate(requests):
+                process.stdin.write(encode_message(dict(request, id=i)))
+                await process.stdin.drain()
+            process.stdin.close()
+
+        async def receive():
+            replies = []
+            while True:
+                try:
+                    header = await process.stdout.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    return replies
+                data = await process.stdout.readexactly(HEADER.unpack(header)[0])
+                replies.append(json.loads(data.decode('utf-8')))
+
+        _, replies = await asyncio.gather(send(), receive())
+        await process.wait()
+        return replies
+
+
+def build_requests(action, count):
+    for i in range(count):
+        domain = 'host%s.example.com' % i
+        if action == 'generate':
+            yield {'action': 'generate', 'domain': domain, 'password': 'stand-in'}
+        else:
+            yield {'action': 'lookup', 'domain': domain}
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog='python -m esgp.nmclient')
+    parser.add_argument('-n', '--count', type=int, default=1000)
+    parser.add_argument('-a', '--action', choices=('lookup', 'generate'), default='lookup')
+    parser.add_argument('command', nargs='*', help='Host command (default: python -m esgp.dispatcher)')
+    args = parser.parse_args(argv)
+
+    command = args.command or [sys.executable, '-m', 'esgp.dispatcher']
+    requests = list(build_requests(args.action, args.count))
+
+    start = time.perf_counter()
+    replies = asyncio.run(StandInClient(command).run(requests))
+    elapsed = time.perf_counter() - start
+
+    ids = [reply.get('id') for reply in replies]
+    failed = [reply for reply in replies if not reply.get('ok')]
+    out_of_order = sum(1 for a, b in zip(ids, ids[1:]) if b is not None and a is not None and b < a)
+
+    print("%s requests, %s replies, %s failed, %s out of order, %.3fs (%.0f req/s)" % (
+        len(requests), len(replies), len(failed), out_of_order, elapsed, len(replies) / elapsed if elapsed else 0))
+
+    if sorted(i for i in ids if i is not None) != list(range(len(requests))) or failed:
+        for reply in failed[:5]:
+            print(reply, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
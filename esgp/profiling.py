@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import builtins
+import sys
+import time
+
+
+class StartupProfile(object):
+    """
+    Records the time spent in first-time imports and prints it in the same layout as
+    ``python -X importtime``, followed by the time it took to show the main window.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.entries = []
+        self.marks = []
+        self._stack = []
+        self._original_import = None
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.started))
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        # time spent in nested first-time imports is subtracted from our own time
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative
+            self.entries.append((name, cumulative - nested, cumulative, len(self._stack)))
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        stream.write("import time: self [us] | cumulative | imported package\n")
+        for name, own, cumulative, depth in self.entries:
+            stream.write("import time: %9d | %10d | %s%s\n" % (own * 1e6, cumulative * 1e6, '  ' * depth, name))
+        for name, elapsed in self.marks:
+            stream.write("startup: %-20s %8.1f ms\n" % (name, elapsed * 1e3))
+        stream.flush()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Public Suffix List (https://publicsuffix.org/) lookups for registrable domains (eTLD+1).
+#
+# The text list is compiled at build time (see setup.py, or ``python -m esgp.psl compile``)
+# into a trie of reversed labels that is memory-mapped and searched in place:
+#
+#   header:  magic (8 bytes), node count (uint32), offset of the label pool (uint32)
+#   nodes:   label offset (uint32), label length (uint16), flags (uint8), padding,
+#            index of the first child (uint32), number of children (uint32)
+#   labels:  UTF-8 label bytes
+#
+# Node 0 is the root. The children of every node are stored next to each other, sorted by
+# their label bytes, so a lookup is one binary search per label of the host name.
+#
+# Files inside a zipapp can not be memory-mapped; there the compiled list is expected next to
+# the archive (see tools/build_zipapp.py). Where nothing was compiled at build time (e.g. a
+# source checkout), the system list is compiled into $XDG_CACHE_HOME/esgp on first use.
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from argparse import ArgumentParser
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ESGPPSL1'
+HEADER = struct.Struct('<8sII')
+NODE = struct.Struct('<IHBxII')
+
+RULE = 1
+EXCEPTION = 2
+
+SOURCE_PATH = '/usr/share/publicsuffix/public_suffix_list.dat'
+_PACKAGE_PATH = os.path.dirname(os.path.abspath(__file__))
+if not os.path.isdir(_PACKAGE_PATH):
+    # imported from a zip archive
+    _PACKAGE_PATH = os.path.dirname(os.path.dirname(_PACKAGE_PATH))
+COMPILED_PATH = os.path.join(_PACKAGE_PATH, 'public_suffix_list.bin')
+
+
+def parse_rules(lines):
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        rule = line.split()[0].lower()
+        if rule.startswith('!'):
+            yield rule[1:], EXCEPTION
+        else:
+            yield rule, RULE
+
+
+def compile_rules(rules):
+    trie = {}
+    for rule, flag in rules:
+        labels = [label.encode('utf-8') for label in reversed(rule.split('.'))]
+        node = trie
+        for label in labels[:-1]:
+            node = node.setdefault(label, [0, {}])[1]
+        node.setdefault(labels[-1], [0, {}])[0] |= flag
+
+    # breadth first, so that the children of every node end up next to each other
+    nodes = [[b'', 0, trie]]
+    i = 0
+    while i < len(nodes):
+        children = nodes[i][2]
+        nodes.extend([label, flags, grandchildren] for label, (flags, grandchildren) in sorted(children.items()))
+        i += 1
+
+    labels = bytearray()
+    records = []
+    next_child = 1
+    for label, flags, children in nodes:
+        records.append(NODE.pack(len(labels), len(label), flags, next_child if children else 0, len(children)))
+        labels += label
+        next_child += len(children)
+
+    labels_offset = HEADER.size + NODE.size * len(records)
+    return HEADER.pack(MAGIC, len(records), labels_offset) + b''.join(records) + bytes(labels)
+
+
+def compile_file(source, destination):
+    with open(source, encoding='utf-8') as i:
+        data = compile_rules(parse_rules(i))
+    tmp = destination + '.tmp'
+    with open(tmp, 'wb') as o:
+        o.write(data)
+    os.replace(tmp, destination)
+
+
+def _lookup_label(label):
+    # the list contains internationalized labels in their unicode form
+    if label.startswith('xn--'):
+        try:
+            label = label.encode('ascii').decode('idna')
+        except UnicodeError:
+            pass
+    return label.encode('utf-8')
+
+
+class PublicSuffixList(object):
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._node_count, self._labels_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError("%s is not a compiled public suffix list" % path)
+
+    def close(self):
+        self._map.close()
+
+    def _node(self, index):
+        return NODE.unpack_from(self._map, HEADER.size + index * NODE.size)
+
+    def _label(self, offset, length):
+        start = self._labels_offset + offset
+        return self._map[start:start + length]
+
+    def _child(self, node, label):
+        first, count = node[3], node[4]
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            child = self._node(first + mid)
+            child_label = self._label(child[0], child[1])
+            if child_label == label:
+                return child
+            if child_label < label:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def public_suffix_length(self, labels):
+        """
+        Number of trailing ``labels`` that form the public suffix (at least 1: the implicit
+        ``*`` rule).
+        """
+        suffix_length = 1
+        node = self._node(0)
+        for depth, label in enumerate(reversed(labels), 1):
+            wildcard = self._child(node, b'*')
+            if wildcard is not None and wildcard[2] & RULE:
+                suffix_length = max(suffix_length, depth)
+
+            child = self._child(node, _lookup_label(label))
+            if child is None:
+                break
+            if child[2] & EXCEPTION:
+                return depth - 1
+            if child[2] & RULE:
+                suffix_length = depth
+            node = child
+        return suffix_length
+
+    def registrable_domain(self, host):
+        """
+        ``'login.accounts.example.co.uk'`` -> ``'example.co.uk'``. Returns None if ``host`` is
+        a public suffix itself.
+        """
+        labels = host.lower().rstrip('.').split('.')
+        suffix_length = self.public_suffix_length(labels)
+        if len(labels) <= suffix_length:
+            return None
+        return '.'.join(labels[-(suffix_length + 1):])
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def source_path():
+    return os.environ.get('PUBLIC_SUFFIX_LIST', SOURCE_PATH)
+
+
+def cache_path():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'esgp', 'public_suffix_list.bin')
+
+
+def _open_default():
+    if os.path.exists(COMPILED_PATH):
+        return PublicSuffixList(COMPILED_PATH)
+
+    source = source_path()
+    cached = cache_path()
+    if os.path.exists(source):
+        if not os.path.exists(cached) or os.path.getmtime(cached) < os.path.getmtime(source):
+            logger.info("Compiling %s into %s", source, cached)
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            compile_file(source, cached)
+        return PublicSuffixList(cached)
+    if os.path.exists(cached):
+        return PublicSuffixList(cached)
+
+    raise OSError("neither %s nor %s exist" % (COMPILED_PATH, source))
+
+
+def default_list():
+    """
+    The list compiled at build time, or the system list compiled on first use. None (with a
+    warning) if there is neither.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            try:
+                _default = _open_default()
+            except (OSError, ValueError) as e:
+                logger.warning("No public suffix list (%s): URLs are reduced to their full host name "
+                               "instead of the registrable domain. Install the publicsuffix package or "
+                               "set $PUBLIC_SUFFIX_LIST and run 'python -m esgp.psl compile'.", e)
+                _default = False
+    return _default or None
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog='python -m esgp.psl')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    compile_parser = subparsers.add_parser('compile', help='Compile the text list')
+    compile_parser.add_argument('source', nargs='?', default=source_path(), help='(default: %(default)s)')
+    compile_parser.add_argument('destination', nargs='?', default=COMPILED_PATH, help='(default: %(default)s)')
+
+    lookup_parser = subparsers.add_parser('lookup', help='Print the registrable domain of host names')
+    lookup_parser.add_argument('hosts', nargs='+')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compile':
+        compile_file(args.source, args.destination)
+        return 0
+
+    psl = default_list()
+    if psl is None:
+        print("%s has not been compiled" % COMPILED_PATH, file=sys.stderr)
+        return 1
+    for host in args.hosts:
+        print("%s\t%s" % (host, psl.registrable_domain(host)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from esgp.secret import wipe
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordCache(object):
+    """
+    Size-limited LRU cache for generated passwords with an idle timeout.
+
+    Entries are keyed by (HMAC of master+secret, domain, length, digest name); the HMAC key is
+    random and only lives in this process, so the cache never holds the master password
+    itself. Passwords are kept in bytearrays which are overwritten when they are evicted,
+    expire or the cache is flushed. The str handed out to callers can not be wiped.
+
+    All methods may be called from any thread.
+    """
+
+    def __init__(self, max_size=32, ttl=300.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._key = os.urandom(32)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def fingerprint(self, pwd, domain, length, digest_name):
+        """
+        The cache key for the inputs; ``pwd`` may be a str or bytes-like (e.g. a SecretBuffer view).
+        """
+        if isinstance(pwd, str):
+            pwd = pwd.encode('utf-8')
+        mac = hmac.new(self._key, pwd, hashlib.sha256).digest()
+        return mac, domain, length, digest_name
+
+    def _expire(self, now):
+        # the least recently used entries are at the front
+        while self._items:
+            key, (value, last_used) = next(iter(self._items.items()))
+            if now - last_used < self.ttl:
+                break
+            del self._items[key]
+            wipe(value)
+
+    def get(self, pwd, domain, length, digest_name):
+        key = self.fingerprint(pwd, domain, length, digest_name)
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            try:
+                value, _ = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._items[key] = (value, now)
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value.decode('ascii')
+
+    def put(self, pwd, domain, length, digest_name, password):
+        key = self.fingerprint(pwd, domain, length, digest_name)
+        with self._lock:
+            now = self._clock()
+            old = self._items.pop(key, None)
+            if old is not None:
+                wipe(old[0])
+            self._items[key] = (bytearray(password.encode('ascii')), now)
+            self._expire(now)
+            while len(self._items) > self.max_size:
+                _, (value, _) = self._items.popitem(last=False)
+                wipe(value)
+
+    def generate(self, pwd, domain, length=10, digest_name='md5'):
+        """
+        Same as ``esgp.engine.generate`` but served from the cache where possible.
+        """
+        password = self.get(pwd, domain, length, digest_name)
+        if password is None:
+            from esgp.engine import generate
+            password = generate(pwd, domain, length, digest_name)
+            self.put(pwd, domain, length, digest_name, password)
+        logger.debug("Password cache: %(hits)s hits, %(misses)s misses, %(size)s entries", self.stats())
+        return password
+
+    def expire(self):
+        with self._lock:
+            self._expire(self._clock())
+
+    def flush(self):
+        with self._lock:
+            for value, _ in self._items.values():
+                wipe(value)
+            self._items.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._items),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import logging
+import os
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer
+
+from esgp.instance import ACK, decode_request, is_private, is_stale, socket_path
+from esgp.dispatcher import Dispatcher, default_handlers
+
+logger = logging.getLogger(__name__)
+
+
+class ResidentServer(QObject):
+    """
+    Accepts requests from later ``python -m esgp`` invocations (see esgp.instance.forward)
+    and emits ``activated(domain, url)`` for each of them.
+    """
+
+    activated = pyqtSignal(object, object)
+
+    def __init__(self, path=None, parent=None):
+        super(ResidentServer, self).__init__(parent)
+        self.path = path
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self.new_connection)
+
+    def listen(self):
+        try:
+            self.path = self.path or socket_path()
+        except OSError as e:
+            logger.error("Not listening for other instances: %s", e)
+            return False
+
+        if os.path.lexists(self.path):
+            # forwarding failed, but that may just have been a busy instance
+            if not is_private(self.path) or not is_stale(self.path):
+                logger.error("Not listening on %s: in use or not owned by us", self.path)
+                return False
+            QLocalServer.removeServer(self.path)
+        if not self.server.listen(self.path):
+            logger.error("Failed to listen on %s: %s", self.path, self.server.errorString())
+            return False
+        logger.info("Listening on %s", self.path)
+        return True
+
+    def close(self):
+        self.server.close()
+
+    def new_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            connection.readyRead.connect(lambda c=connection: self.read_request(c))
+            connection.disconnected.connect(connection.deleteLater)
+
+    def read_request(self, connection):
+        if not connection.canReadLine():
+            return
+
+        try:
+            domain, url = decode_request(bytes(connection.readLine()))
+        except ValueError:
+            logger.warning("Ignoring malformed request")
+            connection.disconnectFromServer()
+            return
+
+        connection.write(ACK)
+        connection.flush()
+        connection.disconnectFromServer()
+        self.activated.emit(domain, url)
+
+
+class NativeMessagingListener(QObject):
+    """
+    Runs the native messaging dispatcher in a background thread for as long as the browser
+    keeps the channel open and emits ``activated(domain, url)`` for every ``show`` request.
+    """
+
+    activated = pyqtSignal(object, object)
+    disconnected = pyqtSignal()
+
+    def __init__(self, config, parent=None):
+        super(NativeMessagingListener, self).__init__(parent)
+        # emitted from a dispatcher worker thread, delivered in the GUI thread
+        self.dispatcher = Dispatcher(default_handlers(config, self.activated.emit))
+        self.thread = threading.Thread(target=self.serve, name='native-messaging', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def serve(self):
+        try:
+            asyncio.run(self.dispatcher.serve_stdio())
+        except Exception:
+            logger.exception("Native messaging dispatcher failed")
+        finally:
+            self.disconnected.emit()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class CoalescingScheduler(QObject):
+    """
+    Calls ``callback`` once on the next event loop turn, no matter how often ``schedule()``
+    was called before that. ``flush()`` runs a pending call right away.
+    """
+
+    def __init__(self, callback, parent=None):
+        super(CoalescingScheduler, self).__init__(parent)
+        self.callback = callback
+        self.requested = 0
+        self.coalesced = 0
+        self.runs = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.run)
+
+    @property
+    def pending(self):
+        return self._timer.isActive()
+
+    def schedule(self):
+        self.requested += 1
+        if self._timer.isActive():
+            self.coalesced += 1
+        else:
+            self._timer.start()
+
+    def flush(self):
+        if self._timer.isActive():
+            self._timer.stop()
+            self.run()
+
+    def run(self):
+        self.runs += 1
+        self.callback()
+
+    def stats(self):
+        return {
+            'requested': self.requested,
+            'coalesced': self.coalesced,
+            'runs': self.runs,
+        }
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+class SecretBuffer(object):
+    """
+    Mutable UTF-8 buffer for secrets typed into the UI, e.g. master + secret password.
+
+    ``set()`` overwrites the buffer in place; it only allocates a new one (and wipes the old)
+    when the secret outgrows it. ``view()`` is a memoryview of the current contents that
+    hashlib, hmac and ``esgp.engine.Engine`` accept without making a copy. ``generation`` is
+    bumped whenever the contents change, so callers can tell changes apart without keeping
+    a copy of the secret.
+
+    The str objects Qt hands out and the encoded parts passed to ``set()`` are immutable and
+    can not be wiped; the buffer just makes sure it does not add copies of its own.
+    """
+
+    def __init__(self, capacity=128):
+        self.generation = 0
+        self._buf = bytearray(capacity)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def set(self, *parts):
+        """
+        Sets the contents to the concatenation of the str ``parts``. Returns whether they changed.
+        """
+        encoded = [part.encode('utf-8') for part in parts if part]
+        length = sum(len(part) for part in encoded)
+
+        if length == self._length and self._equals(encoded):
+            return False
+
+        if length > len(self._buf):
+            self.wipe()
+            self._buf = bytearray(max(length, 2 * len(self._buf)))
+
+        view = memoryview(self._buf)
+        offset = 0
+        for part in encoded:
+            view[offset:offset + len(part)] = part
+            offset += len(part)
+        # leftovers of a longer secret
+        view[length:self._length] = bytes(max(0, self._length - length))
+        view.release()
+
+        self._length = length
+        self.generation += 1
+        return True
+
+    def _equals(self, parts):
+        # compares through a memoryview, slicing the bytearray would copy the secret
+        with memoryview(self._buf) as view:
+            offset = 0
+            for part in parts:
+                if view[offset:offset + len(part)] != part:
+                    return False
+                offset += len(part)
+        return True
+
+    def view(self):
+        return memoryview(self._buf)[:self._length]
+
+    def copy(self):
+        """
+        A private copy for another thread; the receiver should ``wipe()`` it when done.
+        """
+        return bytearray(self.view())
+
+    def wipe(self):
+        self._buf[:] = bytes(len(self._buf))
+        if self._length:
+            self._length = 0
+            self.generation += 1
+
+
+def wipe(buf):
+    """
+    Overwrites a bytearray (e.g. from ``SecretBuffer.copy()``) with zeros.
+    """
+    buf[:] = bytes(len(buf))
@@ -17,28 +17,57 @@ import json
 import os
 import sys
 
-from PyQt5.QtCore import QAbstractTableModel, Qt, QVariant, QModelIndex, QRegExp
+from PyQt5.QtCore import QAbstractTableModel, Qt, QVariant, QModelIndex, QRegExp, QSortFilterProxyModel, \
+    QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt5.QtGui import QIntValidator, QRegExpValidator
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QFrame, QLabel, QTableView, QLineEdit, \
-    QStyledItemDelegate, QPushButton, QComboBox, QHBoxLayout, QTableWidget, QAbstractItemView, QHeaderView
+    QStyledItemDelegate, QPushButton, QComboBox, QHBoxLayout, QAbstractItemView, QHeaderView, \
+    QFileDialog, QProgressBar
 
 import logging
 
+from esgp.domains import DomainSettings
+from esgp.engine import MIN_LENGTH
+
 logger = logging.getLogger(__name__)
 
 class DomainSettingsTableModel(QAbstractTableModel):
     
     properties = ['domain', 'length', 'algorithm']
+
+    # rows handed to the view per fetchMore()
+    batch_size = 256
     
     def __init__(self, config, parent):
+        self._config = config
         self._data = config.domain_settings
+        self._loaded = min(len(self._data), self.batch_size)
         self.default_length = config.length
         self.default_algorithm = config.algorithm
         super(DomainSettingsTableModel, self).__init__(parent)
 
     def rowCount(self, parent=None, *args, **kwargs):
-        return len(self._data)
-    
+        if parent is not None and parent.isValid():
+            return 0
+        return self._loaded
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._loaded < len(self._data)
+
+    def fetchMore(self, parent):
+        self._fetch(self.batch_size)
+
+    def fetch_all(self):
+        self._fetch(len(self._data))
+
+    def _fetch(self, count):
+        count = min(count, len(self._data) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
     def columnCount(self, parent=None, *args, **kwargs):
         return 3
     
@@ -62,8 +91,9 @@ class DomainSettingsTableModel(QAbstractTableModel):
             return ""
 
     def setData(self, index, value, role=None):
-        if index.isValid() and 0 <= index.row() <= self.rowCount():
-            self._data[index.row()][self.properties[index.column()]] = value
+        if index.isValid() and 0 <= index.row() < self.rowCount():
+            self._config.update_domain_settings(index.row(), self.properties[index.column()], value)
+            self.dataChanged.emit(index, index)
             return True
         return False
 
@@ -73,19 +103,71 @@ class DomainSettingsTableModel(QAbstractTableModel):
             return defaultFlags | Qt.ItemIsEditable
         return defaultFlags
 
-    def insertRow(self, p_int, parent=None, *args, **kwargs):
-        self.beginInsertRows(QModelIndex(), p_int, p_int)
-        self._data.insert(p_int, {
-            'domain': '',
-            'length': self.default_length,
-            'algorithm': self.default_algorithm
-        })
+    def insertRows(self, row, count, parent=QModelIndex()):
+        if count <= 0 or not 0 <= row <= self._loaded:
+            return False
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        self._config.insert_domain_settings_batch(row, [
+            DomainSettings('', self.default_algorithm, self.default_length) for _ in range(count)
+        ])
+        self._loaded += count
         self.endInsertRows()
+        return True
 
-    def removeRow(self, p_int, parent=None, *args, **kwargs):
-        self.beginRemoveRows(QModelIndex(), p_int, p_int)
-        self._data.remove(self._data[p_int])
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if count <= 0 or row < 0 or row + count > self._loaded:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        self._config.remove_domain_settings_range(row, count)
+        self._loaded -= count
         self.endRemoveRows()
+        return True
+
+    def merge(self, settings_list, overwrite=False):
+        first = len(self._data)
+        fully_loaded = self._loaded == first
+        added, updated = self._config.merge_domain_settings(settings_list, overwrite)
+        if fully_loaded:
+            # everything was visible, so should the first of the new rows be
+            self._fetch(self.batch_size)
+        if updated and self._loaded:
+            self.dataChanged.emit(self.index(0, 1), self.index(self._loaded - 1, 2))
+        return added, updated
+
+
+class DomainSettingsFilterModel(QSortFilterProxyModel):
+    """
+    Filters the domain settings by a substring of the domain. Rows without a domain (the
+    ones just added with '+') are always shown.
+
+    The filter is applied once typing pauses for ``delay`` milliseconds, as a regular
+    expression on the domain column. Only the matching runs in C++: QSortFilterProxyModel
+    still reads the domain of every row through the model's ``data()``, one Python call per
+    row and filter change. Rows that have not been fetched cannot be filtered, so the first
+    filter loads all of them into the view, which undoes the batched loading of large lists.
+    """
+
+    def __init__(self, parent=None, delay=150):
+        super(DomainSettingsFilterModel, self).__init__(parent)
+        self._needle = ''
+        self.setFilterKeyColumn(0)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.apply_filter)
+
+    def set_filter(self, text):
+        self._needle = (text or '').strip()
+        self._timer.start()
+
+    def apply_filter(self):
+        self._timer.stop()
+        if self._needle:
+            # only rows that have been fetched can be filtered
+            self.sourceModel().fetch_all()
+            self.setFilterRegExp(QRegExp('^$|' + QRegExp.escape(self._needle), Qt.CaseInsensitive))
+        else:
+            self.setFilterRegExp(QRegExp())
 
 
 class SettingsItemDelegate(QStyledItemDelegate):
@@ -102,7 +184,8 @@ class SettingsItemDelegate(QStyledItemDelegate):
 
         if index.column() == 1:
             editor = QLineEdit(widget)
-            editor.setValidator(QIntValidator(0, 99, self))
+            editor.setValidator(QIntValidator(MIN_LENGTH, 99, self))
+            editor.textChanged.connect(lambda: self._mark_length(editor))
             editor.setText(str(index.model().data(index, Qt.EditRole)))
             return editor
 
@@ -115,6 +198,57 @@ class SettingsItemDelegate(QStyledItemDelegate):
 
         return super(SettingsItemDelegate, self).createEditor(widget, option, index)
 
+    def _mark_length(self, editor):
+        length_ok = editor.hasAcceptableInput()
+        editor.setStyleSheet('' if length_ok else 'color: red')
+        editor.setToolTip('' if length_ok else "The password length must be between %s and %s" % (
+            MIN_LENGTH, editor.validator().top()))
+
+    def setModelData(self, editor, model, index):
+        # a length the engine rejects is not stored, the cell keeps its previous value
+        if index.column() == 1 and not editor.hasAcceptableInput():
+            return
+        super(SettingsItemDelegate, self).setModelData(editor, model, index)
+
+
+class _ImportSignals(QObject):
+    batch = pyqtSignal(object)
+    # per mille of the file read
+    progress = pyqtSignal(int)
+    # error message or None
+    finished = pyqtSignal(object)
+
+
+class _ImportWorker(QRunnable):
+    """
+    Reads and normalizes the domains of an export in the background; the batches are merged
+    into the configuration by the GUI thread.
+    """
+
+    def __init__(self, importer, path):
+        super(_ImportWorker, self).__init__()
+        self.importer = importer
+        self.path = path
+        self.cancelled = False
+        self.signals = _ImportSignals()
+
+    def run(self):
+        from esgp.importer import ImportFormatError
+
+        def progress(position, size):
+            if size:
+                self.signals.progress.emit(1000 * position // size)
+
+        try:
+            for batch in self.importer.batches(self.path, progress=progress):
+                if self.cancelled:
+                    break
+                self.signals.batch.emit(batch)
+        except (OSError, ImportFormatError) as e:
+            self.signals.finished.emit(str(e))
+        else:
+            self.signals.finished.emit(None)
+
 
 class SettingsDialog(QDialog):
     
@@ -123,6 +257,12 @@ class SettingsDialog(QDialog):
         super(SettingsDialog, self).__init__(*args, **kwargs)
         self.domain_settings_model = None
         self.del_button = None
+        self.import_button = None
+        self.import_progress = None
+        self.import_status = None
+        self.importer = None
+        self.import_worker = None
+        self.import_pool = QThreadPool(self)
         self.build_ui()
     
     def build_ui(self):
@@ -180,13 +320,23 @@ class SettingsDialog(QDialog):
         domain_settings_layout.addWidget(QLabel("Per-domain settings"))
 
         self.domain_settings_model = DomainSettingsTableModel(self.config, self)
+        self.domain_settings_filter = DomainSettingsFilterModel(self)
+        self.domain_settings_filter.setSourceModel(self.domain_settings_model)
+
+        filter_edit = QLineEdit('', self)
+        filter_edit.setPlaceholderText("Filter domains")
+        filter_edit.setClearButtonEnabled(True)
+        filter_edit.textChanged.connect(self.domain_settings_filter.set_filter)
+        domain_settings_layout.addWidget(filter_edit)
 
         self.domain_settings_table = QTableView()
         self.domain_settings_table.setItemDelegate(SettingsItemDelegate())
-        self.domain_settings_table.setModel(self.domain_settings_model)
-        self.domain_settings_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.domain_settings_table.setModel(self.domain_settings_filter)
+        self.domain_settings_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.domain_settings_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.domain_settings_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        # fixed row heights: the view does not have to measure 100k rows
+        self.domain_settings_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.domain_settings_table.clicked.connect(self.selected)
         domain_settings_layout.addWidget(self.domain_settings_table)
         
@@ -196,24 +346,88 @@ class SettingsDialog(QDialog):
         self.del_button.clicked.connect(self.delete_domain_settings_row)
         self.del_button.setEnabled(False)
 
+        self.import_button = QPushButton('Import...')
+        self.import_button.clicked.connect(self.import_domain_settings)
+
         hbox = QHBoxLayout()
         hbox.addWidget(add_button)
         hbox.addWidget(self.del_button)
+        hbox.addWidget(self.import_button)
         domain_settings_layout.addLayout(hbox)
 
+        self.import_progress = QProgressBar(self)
+        self.import_progress.setRange(0, 1000)
+        self.import_progress.setVisible(False)
+        domain_settings_layout.addWidget(self.import_progress)
+        self.import_status = QLabel(self)
+        self.import_status.setVisible(False)
+        domain_settings_layout.addWidget(self.import_status)
+
         domain_settings_frame = QFrame(self)
         domain_settings_frame.setLayout(domain_settings_layout)
         return domain_settings_frame
 
     def add_domain_settings_row(self):
-        self.domain_settings_model.insertRow(self.domain_settings_model.rowCount())
+        row = self.domain_settings_model.rowCount()
+        self.domain_settings_model.insertRows(row, 1)
+        index = self.domain_settings_filter.mapFromSource(self.domain_settings_model.index(row, 0))
+        self.domain_settings_table.scrollTo(index)
+        self.domain_settings_table.edit(index)
 
     def delete_domain_settings_row(self, *args):
         selected = self.domain_settings_table.selectedIndexes()
-        if selected:
-            rows = set([i.row() for i in selected])
-            for row in rows:
-                self.domain_settings_model.removeRow(row)
+        if not selected:
+            return
+
+        rows = sorted(set(self.domain_settings_filter.mapToSource(i).row() for i in selected), reverse=True)
+
+        # remove contiguous ranges from the bottom up so the remaining row numbers stay valid
+        start = end = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == start - 1:
+                start = row
+                continue
+            self.domain_settings_model.removeRows(start, end - start + 1)
+            if row is not None:
+                start = end = row
+        self.del_button.setEnabled(False)
+
+    def import_domain_settings(self):
+        from esgp.importer import Importer
+
+        path, _ = QFileDialog.getOpenFileName(self, "Import domains", os.path.expanduser('~'),
+                                              "Exports (*.csv *.jsonl *.ndjson);;All files (*)")
+        if not path:
+            return
+
+        self.importer = Importer(self.config.algorithm, self.config.length)
+        self.import_worker = _ImportWorker(self.importer, path)
+        self.import_worker.signals.batch.connect(self.import_batch)
+        self.import_worker.signals.progress.connect(self.import_progress.setValue)
+        self.import_worker.signals.finished.connect(self.import_finished)
+
+        self.import_button.setEnabled(False)
+        self.import_progress.setValue(0)
+        self.import_progress.setVisible(True)
+        self.import_status.setVisible(False)
+        self.import_pool.start(self.import_worker)
+
+    def import_batch(self, batch):
+        self.importer.merged(batch, *self.domain_settings_model.merge(batch))
+
+    def import_finished(self, error):
+        from esgp.importer import SUMMARY
+
+        self.import_button.setEnabled(True)
+        self.import_progress.setVisible(False)
+        self.import_status.setText("Import failed: %s" % error if error else SUMMARY % self.importer.stats())
+        self.import_status.setVisible(True)
+        self.import_worker = None
+
+    def done(self, result):
+        if self.import_worker is not None:
+            self.import_worker.cancelled = True
+        super(SettingsDialog, self).done(result)
 
     def save_and_close(self):
         self.config.write()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from esgp.secret import wipe
+
+logger = logging.getLogger(__name__)
+
+
+class _PasswordSignals(QObject):
+    # generation, key, password
+    finished = pyqtSignal(int, object, object)
+
+
+class _PasswordWorker(QRunnable):
+
+    def __init__(self, generation, key, inputs, cache):
+        super(_PasswordWorker, self).__init__()
+        self.generation = generation
+        self.key = key
+        self.inputs = inputs
+        self.cache = cache
+        self.signals = _PasswordSignals()
+
+    def run(self):
+        try:
+            password = self.cache.generate(*self.inputs)
+        finally:
+            wipe(self.inputs[0])
+        self.signals.finished.emit(self.generation, self.key, password)
+
+
+class SpeculativeGenerator(QObject):
+    """
+    Generates the password in a background thread once the inputs (password, domain, length,
+    digest name) have not changed for ``delay`` milliseconds, so that ``take()`` can return
+    it right away when the user asks for it. Every change of the inputs discards the result.
+
+    Passwords are generated through ``cache`` (a ``PasswordCache``). The password in the
+    inputs may be a view of a ``SecretBuffer``; the worker gets a copy of it.
+    """
+
+    def __init__(self, cache, delay=300, parent=None):
+        super(SpeculativeGenerator, self).__init__(parent)
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._inputs = None
+        self._key = None
+        self._generation = 0
+        self._result = None
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.start)
+
+    def _fingerprint(self, inputs):
+        return self.cache.fingerprint(*inputs) if inputs else None
+
+    def inputs_changed(self, inputs):
+        key = self._fingerprint(inputs)
+        if key == self._key:
+            return
+
+        self._generation += 1
+        self._pool.clear()
+        self._result = None
+        self._key = key
+        self._inputs = inputs
+
+        if inputs:
+            self._timer.start()
+        else:
+            self._timer.stop()
+
+    def start(self):
+        if not self._inputs:
+            return
+        pwd, domain, length, digest_name = self._inputs
+        worker = _PasswordWorker(self._generation, self._key, (bytearray(pwd), domain, length, digest_name), self.cache)
+        worker.signals.finished.connect(self.finished)
+        self._pool.start(worker)
+
+    def finished(self, generation, key, password):
+        if generation == self._generation:
+            self._result = (key, password)
+
+    def take(self, inputs):
+        """
+        Returns the precomputed password for ``inputs`` or None.
+        """
+        key = self._fingerprint(inputs)
+        if self._result is not None and self._result[0] == key:
+            self.hits += 1
+            password = self._result[1]
+        else:
+            self.misses += 1
+            password = None
+        logger.debug("Speculative generation: %s hits, %s misses", self.hits, self.misses)
+        return password
+
+    def clear(self):
+        self.inputs_changed(None)
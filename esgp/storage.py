@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Storage backends for Configuration.
+#
+# IniStorage is the classic ~/.esgp.cfg file; it is always read and written as a whole (the
+# write goes to a temporary file which then replaces the original). SqliteStorage keeps one
+# row per domain, looks domains up on demand and only writes the rows that changed.
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+from esgp.domains import DomainSettings, normalize_domain
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write(path, write):
+    """
+    Calls ``write(fileobj)`` on a temporary file next to ``path`` and moves it over ``path``
+    once everything has been written, so readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.%s.' % os.path.basename(path), dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as o:
+            write(o)
+            o.flush()
+            os.fsync(o.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class IniStorage(object):
+
+    lazy = False
+
+    def __init__(self, path):
+        self.path = path
+
+    def _parser(self):
+        parser = ConfigParser()
+        parser.read(self.path)
+        return parser
+
+    def load_defaults(self, algorithm, length):
+        parser = self._parser()
+        if parser.has_section('defaults'):
+            algorithm = parser.get('defaults', 'algorithm', fallback=algorithm)
+            length = int(parser.get('defaults', 'length', fallback=length))
+        return algorithm, length
+
+    def load(self, algorithm, length):
+        parser = self._parser()
+
+        if parser.has_section('defaults'):
+            algorithm = parser.get('defaults', 'algorithm', fallback=algorithm)
+            length = int(parser.get('defaults', 'length', fallback=length))
+
+        domain_settings = []
+        for section in parser.sections():
+            if section == "defaults":
+                continue
+
+            domain_settings.append(DomainSettings(
+                section,
+                parser.get(section, 'algorithm', fallback=algorithm),
+                parser.get(section, 'length', fallback=length)
+            ))
+
+        return algorithm, length, domain_settings
+
+    def save(self, algorithm, length, domain_settings, changes=None):
+        # changes are irrelevant here: an INI file can only be rewritten as a whole
+        parser = ConfigParser()
+
+        parser.add_section('defaults')
+        parser.set('defaults', 'algorithm', algorithm)
+        parser.set('defaults', 'length', str(length))
+
+        for settings in domain_settings or []:
+            domain = settings['domain']
+            if not domain or parser.has_section(domain):
+                continue
+            parser.add_section(domain)
+            parser.set(domain, 'algorithm', settings['algorithm'])
+            parser.set(domain, 'length', str(settings['length']))
+
+        atomic_write(self.path, parser.write)
+
+
+class SqliteStorage(object):
+
+    lazy = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS defaults (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS domains (
+            domain TEXT PRIMARY KEY,
+            algorithm TEXT NOT NULL,
+            length INTEGER NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        # the dispatcher looks up domains from its worker threads
+        self.lock = threading.RLock()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript(self.SCHEMA)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def load_defaults(self, algorithm, length):
+        with self.lock:
+            values = dict(self.connection.execute("SELECT key, value FROM defaults"))
+        return values.get('algorithm', algorithm), int(values.get('length', length))
+
+    def load(self, algorithm, length):
+        algorithm, length = self.load_defaults(algorithm, length)
+        with self.lock:
+            domain_settings = [
+                DomainSettings(*row) for row in self.connection.execute("SELECT domain, algorithm, length FROM domains")
+            ]
+        return algorithm, length, domain_settings
+
+    def lookup(self, candidates):
+        """
+        Returns the settings of the first of ``candidates`` (normalized domains, most specific
+        first) that exists.
+        """
+        if not candidates:
+            return None
+        with self.lock:
+            rows = dict((row[0], row) for row in self.connection.execute(
+                "SELECT domain, algorithm, length FROM domains WHERE domain IN (%s)" % ','.join('?' * len(candidates)),
+                candidates))
+        for candidate in candidates:
+            if candidate in rows:
+                return DomainSettings(*rows[candidate])
+        return None
+
+    def save(self, algorithm, length, domain_settings, changes=None):
+        """
+        Stores the defaults and, if ``domain_settings`` were loaded, either the (normalized)
+        domains named in ``changes`` (upsert or delete) or, if ``changes`` is None, replaces
+        all of them.
+        """
+        with self.lock, self.connection as connection:
+            connection.executemany("INSERT OR REPLACE INTO defaults (key, value) VALUES (?, ?)",
+                                   [('algorithm', algorithm), ('length', str(length))])
+
+            if domain_settings is None:
+                return
+
+            by_domain = {}
+            for settings in domain_settings:
+                domain = normalize_domain(settings['domain'])
+                if domain and domain not in by_domain:
+                    by_domain[domain] = settings
+
+            if changes is None:
+                connection.execute("DELETE FROM domains")
+                changes = by_domain.keys()
+
+            upserts = []
+            deletes = []
+            for domain in changes:
+                settings = by_domain.get(domain)
+                if settings is None:
+                    deletes.append((domain, ))
+                else:
+                    upserts.append((domain, settings['algorithm'], int(settings['length'])))
+
+            connection.executemany("DELETE FROM domains WHERE domain = ?", deletes)
+            connection.executemany("INSERT OR REPLACE INTO domains (domain, algorithm, length) VALUES (?, ?, ?)",
+                                   upserts)
+
+
+def main(command, argv):
+    """
+    ``import-ini``: copies an INI configuration into the SQLite database, which is used from
+    then on. ``export-ini``: writes the current configuration to an INI file.
+    """
+    from esgp.config import DB_PATH, PATH, Configuration
+
+    parser = ArgumentParser(prog='esgp %s' % command)
+    if command == 'import-ini':
+        parser.add_argument('path', nargs='?', default=PATH, help='INI file to import (default: %(default)s)')
+        parser.add_argument('--database', default=DB_PATH, help='SQLite database (default: %(default)s)')
+        args = parser.parse_args(argv)
+
+        config = Configuration(IniStorage(args.path))
+        config.read()
+        storage = SqliteStorage(args.database)
+        config.save_to(storage)
+        storage.close()
+        logger.info("Imported %s domains from %s into %s", len(config.domain_settings), args.path, args.database)
+    else:
+        parser.add_argument('path', help='INI file to write')
+        args = parser.parse_args(argv)
+
+        config = Configuration()
+        config.read()
+        config.save_to(IniStorage(args.path))
+
+    return 0
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Opt-in tracing of UI slots and configuration I/O (``--trace FILE``).
+#
+# Nothing in here is active unless ``instrument()`` is called: the traced methods are
+# replaced on their classes at that point, so there is no overhead at all when tracing is
+# off. Arguments and return values are never recorded, since they include the passwords.
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+TRACED = {
+    'esgp.ui.MainWindow': ['options_changed', 'update_state', 'domain_changed', 'generate_identicon',
+                           'identicon_ready', 'generate_password'],
+    'esgp.config.Configuration': ['read', 'write'],
+}
+
+
+class Tracer(object):
+
+    def __init__(self):
+        self.events = []
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def record(self, name, category, start, wall, cpu, args):
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': wall * 1e6,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': dict(args, cpu_us=round(cpu * 1e6, 3)),
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def write(self, path):
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w') as o:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, o)
+
+
+def _describe_sender(obj):
+    # only the names of the signal and the emitting widget, never their contents
+    sender = getattr(obj, 'sender', None)
+    if sender is None:
+        return {}
+    try:
+        source = sender()
+    except (TypeError, RuntimeError):
+        return {}
+    if source is None:
+        return {}
+
+    args = {'sender': source.metaObject().className()}
+    if source.objectName():
+        args['sender'] += '#' + source.objectName()
+    index = obj.senderSignalIndex()
+    if index >= 0:
+        args['signal'] = bytes(source.metaObject().method(index).methodSignature()).decode('ascii')
+    return args
+
+
+def _positional_limit(func):
+    # PyQt passes all signal arguments to a slot that accepts them, so the wrapper must not
+    # accept more positional arguments than the original method
+    params = list(inspect.signature(func).parameters.values())
+    if any(p.kind == p.VAR_POSITIONAL for p in params):
+        return None
+    return len([p for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)])
+
+
+def trace(tracer, func, name, category):
+    limit = _positional_limit(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if limit is not None:
+            args = args[:limit]
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.thread_time() - cpu_start
+            tracer.record(name, category, start, wall, cpu, _describe_sender(args[0]) if args else {})
+
+    wrapper.__wrapped_by_tracer__ = True
+    return wrapper
+
+
+def instrument(tracer, targets=None):
+    """
+    Replaces the methods listed in ``targets`` (default: ``TRACED``) with traced versions.
+    Must be called before the objects whose slots are traced are created, since Qt signal
+    connections bind the method that is current at that time.
+    """
+    import importlib
+
+    for path, methods in (targets or TRACED).items():
+        module_name, class_name = path.rsplit('.', 1)
+        cls = getattr(importlib.import_module(module_name), class_name)
+        for method in methods:
+            func = getattr(cls, method)
+            if getattr(func, '__wrapped_by_tracer__', False):
+                continue
+            setattr(cls, method, trace(tracer, func, '%s.%s' % (class_name, method), module_name))
@@ -13,19 +13,20 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import hashlib
 import logging
-from io import BytesIO
-from urllib.parse import urlparse
 
-import supergenpass
-from PyQt5.QtCore import QEvent, Qt
-from PyQt5.QtGui import QPixmap, QIntValidator, QIcon
+from PyQt5.QtCore import QEvent, Qt, QThreadPool, QTimer
+from PyQt5.QtGui import QIntValidator, QIcon, QPixmap
 from PyQt5.QtWidgets import QVBoxLayout, QLineEdit, QHBoxLayout, QRadioButton, QLabel, QPushButton, \
     QFrame, QDialog, QApplication
 
-from esgp.settings import SettingsDialog
-from pydenticon5 import Pydenticon5
+from esgp.clipboard import ClipboardWatcher
+from esgp.engine import MIN_LENGTH
+from esgp.identicon import IdenticonCache, IdenticonWorker
+from esgp.pwcache import PasswordCache
+from esgp.scheduler import CoalescingScheduler
+from esgp.secret import SecretBuffer
+from esgp.speculative import SpeculativeGenerator
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +46,27 @@ class MainWindow(QDialog):
         self.chars = None
         self.radio_md5 = None
         self.radio_sha = None
+        # master + secret password, updated in place on every keystroke
+        self.secret = SecretBuffer()
+        self.identicon_cache = IdenticonCache()
+        self.identicon_pool = QThreadPool(self)
+        self.identicon_pool.setMaxThreadCount(1)
+        self.identicon_generation = 0
+        self.identicon_disk_cache = None
+        if getattr(cmdargs, 'identicon_cache', False):
+            from esgp.diskcache import DiskIdenticonCache
+            self.identicon_disk_cache = DiskIdenticonCache()
+        self.clipboard = ClipboardWatcher(QApplication.clipboard(), self)
+        # all option signals of one event loop turn result in a single update_state()
+        self.update_scheduler = CoalescingScheduler(self.update_state, self)
+        self.identicon_inputs = None
+        self.identicon_skipped = 0
+        self.password_cache = PasswordCache()
+        # idle entries must not outlive their TTL just because nothing asks for them
+        self.password_cache_timer = QTimer(self)
+        self.password_cache_timer.timeout.connect(self.password_cache.expire)
+        self.password_cache_timer.start(60 * 1000)
+        self.speculative = SpeculativeGenerator(self.password_cache, parent=self)
 
         self.build_ui()
         self.set_default_settings()
@@ -67,6 +89,7 @@ class MainWindow(QDialog):
         self.master_password = QLineEdit('', self)
         self.master_password.setPlaceholderText("Master password")
         self.master_password.setEchoMode(QLineEdit.Password)
+        self.master_password.textChanged.connect(self.secret_changed)
         self.master_password.textChanged.connect(self.options_changed)
         self.master_password.installEventFilter(self)
         self.master_password.setFocus()
@@ -82,6 +105,7 @@ class MainWindow(QDialog):
         self.secret_password = QLineEdit('', self)
         self.secret_password.setPlaceholderText("Secret password")
         self.secret_password.setEchoMode(QLineEdit.Password)
+        self.secret_password.textChanged.connect(self.secret_changed)
         self.secret_password.textChanged.connect(self.options_changed)
         self.secret_password.installEventFilter(self)
         vbox.addWidget(self.secret_password)
@@ -109,7 +133,7 @@ class MainWindow(QDialog):
         settings = QHBoxLayout()
         
         self.chars = QLineEdit('', self)
-        self.chars.setValidator(QIntValidator(0, 99, self))
+        self.chars.setValidator(QIntValidator(MIN_LENGTH, 99, self))
         self.chars.textChanged.connect(self.options_changed)
         self.chars.installEventFilter(self)
         settings.addWidget(self.chars)
@@ -151,12 +175,37 @@ class MainWindow(QDialog):
         return super(MainWindow, self).eventFilter(source, event)
 
     def options_changed(self):
-        self.generate_identicon()
-        self.generate_button.setEnabled(bool(self.master_password.text() or "") and bool(self.domain.text() or ""))
+        self.update_scheduler.schedule()
+
+    def secret_changed(self):
+        self.secret.set(self.master_password.text(), self.secret_password.text())
+
+    def update_state(self):
+        identicon_inputs = (self.secret.generation, self.get_digest_name())
+        if identicon_inputs != self.identicon_inputs:
+            self.identicon_inputs = identicon_inputs
+            self.generate_identicon()
+        else:
+            self.identicon_skipped += 1
+
+        # the validator lets intermediate values like "1" through while the field is edited
+        length_ok = self.chars.hasAcceptableInput()
+        self.chars.setStyleSheet('' if length_ok else 'color: red')
+        self.chars.setToolTip('' if length_ok else "The password length must be between %s and %s" % (
+            MIN_LENGTH, self.chars.validator().top()))
+
+        self.generate_button.setEnabled(bool(self.master_password.text() or "") and bool(self.domain.text() or "")
+                                        and length_ok)
         self.generated_password.setVisible(False)
+        if not self.master_password.text():
+            self.password_cache.flush()
+        self.speculative.inputs_changed(self.get_generation_inputs())
+        logger.debug("Updates: %(requested)s requested, %(coalesced)s coalesced, %(runs)s run; "
+                     "%(identicon_skipped)s identicon updates skipped",
+                     dict(self.update_scheduler.stats(), identicon_skipped=self.identicon_skipped))
         
     def domain_changed(self, text):
-        if QApplication.clipboard().text() == text and text:
+        if text and self.clipboard.text == text:
             self.domain_pasted(text)
     
         domain_settings = self.config.get_domain_settings(self.domain.text())
@@ -173,53 +222,105 @@ class MainWindow(QDialog):
         self.radio_sha.setChecked(self.config.algorithm == 'SHA')
 
     def domain_pasted(self, text):
-        try:
-            chunks = urlparse(text)
-            if chunks.netloc and chunks.netloc != text:
-                self.domain.setText(chunks.netloc)
-        except:
-            pass
+        domain = self.clipboard.domain(text)
+        if domain:
+            self.domain.setText(domain)
+
+    def activate(self, domain=None, url=None):
+        if domain:
+            self.domain.setText(domain)
+        if url:
+            self.domain_pasted(url)
+        self.show()
+        self.raise_()
+        self.activateWindow()
+
+    def hideEvent(self, event):
+        self.speculative.clear()
+        self.password_cache.flush()
+        if not event.spontaneous() and not QApplication.quitOnLastWindowClosed():
+            # closed, but the process lives on (resident or native messaging): the next
+            # activation must not show an unlocked window
+            self.master_password.clear()
+            self.secret_password.clear()
+            self.identicon_label.clear()
+            self.identicon_label.setVisible(False)
+            self.identicon_inputs = None
+            self.generated_password.clear()
+            self.generated_password.setVisible(False)
+        super(MainWindow, self).hideEvent(event)
+
+    def showEvent(self, event):
+        # the buffer is wiped when the window is closed
+        self.secret_changed()
+        self.options_changed()
+        super(MainWindow, self).showEvent(event)
+
+    def closeEvent(self, event):
+        self.secret.wipe()
+        super(MainWindow, self).closeEvent(event)
 
     def get_pwd(self):
-        return "%s%s" % (self.master_password.text() or "", self.secret_password.text() or "")
+        return self.secret.view()
 
     def generate_identicon(self):
-        pwd = self.get_pwd()
-        
-        if not pwd:
+        if not len(self.secret):
             return
         
-        s = pwd
-        for i in range(0, 5):
-            h = self.get_digest()()
-            h.update(s.encode('utf-8'))
-            s = h.hexdigest()
-
-        img = QPixmap()
-        identicon = Pydenticon5().draw(s, 16)
-        img_bytes = BytesIO()
-        identicon.save(img_bytes, 'PNG')
-        img.loadFromData(img_bytes.getvalue())
+        # anything still queued is stale now
+        self.identicon_pool.clear()
+        self.identicon_generation += 1
+
+        worker = IdenticonWorker(self.identicon_generation, self.secret.copy(), self.get_digest_name(),
+                                 self.identicon_cache, disk_cache=self.identicon_disk_cache)
+        worker.signals.finished.connect(self.identicon_ready)
+        self.identicon_pool.start(worker)
+
+    def identicon_ready(self, generation, key, image):
+        if image is not None:
+            self.identicon_cache.put(key, QPixmap.fromImage(image))
+
+        if generation != self.identicon_generation:
+            logger.debug("Dropping stale identicon (generation %s, current %s)", generation, self.identicon_generation)
+            return
+
+        img = self.identicon_cache.get(key)
+        logger.debug("Identicon cache: %(hits)s hits, %(misses)s misses, %(size)s entries", self.identicon_cache.stats())
+        if img is None:
+            # evicted between the worker's check and now
+            self.generate_identicon()
+            return
+
         self.identicon_label.setVisible(True)
         self.identicon_label.setPixmap(img)
 
-    def get_digest(self):
-        if self.radio_md5.isChecked():
-            return hashlib.md5
-        return hashlib.sha512
-
     def get_digest_name(self):
         if self.radio_md5.isChecked():
             return 'md5'
         return 'sha512'
         
+    def get_generation_inputs(self):
+        if not (self.master_password.text() and self.domain.text() and self.chars.hasAcceptableInput()):
+            return None
+        return self.get_pwd(), self.domain.text(), int(self.chars.text()), self.get_digest_name()
+
     def generate_password(self):
-        if self.master_password.text() and self.domain.text():
-            text = supergenpass.generate(self.get_pwd(), self.domain.text(), int(self.chars.text()), self.get_digest_name())
+        # an update still pending from the last keystroke would hide the password again
+        self.update_scheduler.flush()
+
+        inputs = self.get_generation_inputs()
+        if inputs:
+            text = self.speculative.take(inputs)
+            if text is None:
+                text = self.password_cache.generate(*inputs)
             self.generated_password.setText(text)
             self.generated_password.setVisible(True)
             self.generated_password.selectAll()
             self.generated_password.setFocus()
+        elif not self.chars.hasAcceptableInput():
+            # Enter in one of the fields; point at what keeps the button disabled
+            self.chars.selectAll()
+            self.chars.setFocus()
 
     def save_settings(self):
         self.config.algorithm = 'MD5' if self.radio_md5.isChecked() else 'SHA'
@@ -227,5 +328,6 @@ class MainWindow(QDialog):
         self.config.write()
 
     def advanced_settings(self):
+        from esgp.settings import SettingsDialog
         settings_dialog = SettingsDialog(config=self.config)
         settings_dialog.exec_()
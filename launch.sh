@@ -1,5 +1,11 @@
-#!/bin/bash
+#!/bin/sh
+# Started by the browser for native messaging: exec the interpreter directly so that it
+# inherits stdin/stdout instead of reading them through a pipe.
+# Prefers the zipapp built by tools/build_zipapp.py if there is one.
+ESGP_VENV="${ESGP_VENV:-$HOME/dev/.virtualenv/esgp}"
 
-source ~/dev/.virtualenv/esgp/bin/activate
-cd $(dirname $0)
-cat /dev/stdin | python3 -m esgp $*
+cd "$(dirname "$0")" || exit 1
+if [ -f dist/esgp.pyz ]; then
+    exec "$ESGP_VENV/bin/python3" dist/esgp.pyz "$@"
+fi
+exec "$ESGP_VENV/bin/python3" -m esgp "$@"
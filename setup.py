@@ -1,9 +1,33 @@
 #!/usr/bin/env python3
+import os
 
 from setuptools import setup
+from setuptools.command.build_py import build_py
 
 VERSION = "0.1"
 
+
+class BuildWithPublicSuffixList(build_py):
+    """
+    Compiles the Public Suffix List into the memory-mapped trie used by esgp.psl.
+    The source defaults to the system copy and can be overridden with $PUBLIC_SUFFIX_LIST.
+    """
+
+    def run(self):
+        build_py.run(self)
+
+        from esgp.psl import SOURCE_PATH, compile_file
+
+        source = os.environ.get('PUBLIC_SUFFIX_LIST', SOURCE_PATH)
+        if not os.path.exists(source):
+            self.warn("%s not found, domains will not be reduced to their registrable domain" % source)
+            return
+
+        destination = os.path.join(self.build_lib, 'esgp', 'public_suffix_list.bin')
+        self.mkpath(os.path.dirname(destination))
+        compile_file(source, destination)
+
+
 setup(name="esgp",
       version=VERSION,
       description="Enhanced SuperGenPass",
@@ -15,4 +39,7 @@ setup(name="esgp",
           'daiquiri',
           'PyQt5',
       ],
+      cmdclass={
+          'build_py': BuildWithPublicSuffixList,
+      },
 )
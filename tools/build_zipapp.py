@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Johann Schmitz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Packages esgp and its pure-Python dependencies into a single executable zip archive with
+# precompiled bytecode:
+#
+#   python tools/build_zipapp.py [-o dist/esgp.pyz] [--compare 20]
+#
+# Binary distributions (PyQt5, Pillow) can not be imported from a zip and are left to the
+# interpreter's site-packages. --compare prints the median startup time of
+# ``python -m esgp --help`` and of the archive.
+import compileall
+import os
+import py_compile
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipapp
+from argparse import ArgumentParser
+
+try:
+    from importlib import metadata
+except ImportError:  # Python < 3.8
+    import importlib_metadata as metadata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BINARY_SUFFIXES = ('.so', '.pyd', '.dll', '.dylib')
+
+MAIN = '''\
+import sys
+
+from esgp.__main__ import main
+
+sys.exit(main())
+'''
+
+
+def requirements(path):
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if '#egg=' in line:
+                # -e git+https://...#egg=name
+                yield line.split('#egg=')[1]
+            elif line and not line.startswith(('#', '-')):
+                yield line
+
+
+def _name(requirement):
+    for separator in ';[<>=!~ ':
+        requirement = requirement.split(separator)[0]
+    return requirement.strip()
+
+
+def dependencies(names):
+    """
+    Yields the installed distributions ``names`` depend on, including themselves.
+    """
+    seen = set()
+    pending = [_name(name) for name in names]
+    while pending:
+        name = pending.pop()
+        key = name.lower().replace('_', '-')
+        if key in seen:
+            continue
+        seen.add(key)
+
+        try:
+            dist = metadata.distribution(name)
+        except metadata.PackageNotFoundError:
+            print("warning: %s is not installed" % name, file=sys.stderr)
+            continue
+        yield dist
+        # extras are not installed by default; their requirements are skipped
+        pending.extend(_name(r) for r in dist.requires or [] if 'extra ==' not in r)
+
+
+def is_pure(dist):
+    return not any(str(f).endswith(BINARY_SUFFIXES) for f in dist.files or [])
+
+
+def copy_distribution(dist, destination):
+    for f in dist.files or []:
+        # scripts and data files live outside of site-packages
+        if f.parts[0] == '..' or '__pycache__' in f.parts:
+            continue
+        target = os.path.join(destination, *f.parts)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(str(f.locate()), target)
+
+
+def build(output):
+    # compiles the public suffix list as a side effect
+    subprocess.check_call([sys.executable, 'setup.py', '-q', 'build_py'], cwd=ROOT)
+    build_lib = os.path.join(ROOT, 'build', 'lib', 'esgp')
+
+    staging = tempfile.mkdtemp(prefix='esgp-zipapp-')
+    try:
+        shutil.copytree(build_lib, os.path.join(staging, 'esgp'),
+                        ignore=shutil.ignore_patterns('__pycache__', 'public_suffix_list.bin'))
+
+        for dist in dependencies(requirements(os.path.join(ROOT, 'requirements.txt'))):
+            if is_pure(dist):
+                print("bundling %s %s" % (dist.metadata['Name'], dist.version))
+                copy_distribution(dist, staging)
+            else:
+                print("not bundling %s %s (binary)" % (dist.metadata['Name'], dist.version))
+
+        with open(os.path.join(staging, '__main__.py'), 'w') as f:
+            f.write(MAIN)
+
+        # zipimport only loads foo.pyc next to foo.py, not __pycache__/; unchecked hash based
+        # .pyc files are used without comparing them with the source
+        compileall.compile_dir(staging, quiet=1, legacy=True,
+                               invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        zipapp.create_archive(staging, output, interpreter='/usr/bin/env python3', compressed=True)
+    finally:
+        shutil.rmtree(staging)
+
+    compiled = os.path.join(build_lib, 'public_suffix_list.bin')
+    if os.path.exists(compiled):
+        shutil.copy2(compiled, os.path.join(os.path.dirname(os.path.abspath(output)), 'public_suffix_list.bin'))
+
+    print("wrote %s (%d KiB)" % (output, os.path.getsize(output) // 1024))
+
+
+def startup_time(command, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def compare(output, runs):
+    for name, command in (('python -m esgp', [sys.executable, '-m', 'esgp', '--help']),
+                          ('zipapp', [sys.executable, os.path.abspath(output), '--help'])):
+        print("%-16s %8.1f ms (median of %d)" % (name, startup_time(command, runs) * 1e3, runs))
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog='build_zipapp.py')
+    parser.add_argument('-o', '--output', default=os.path.join(ROOT, 'dist', 'esgp.pyz'),
+                        help='Archive to write (default: %(default)s)')
+    parser.add_argument('--compare', type=int, metavar='RUNS', default=0,
+                        help='Compare the startup time with python -m esgp over RUNS runs')
+    args = parser.parse_args(argv)
+
+    build(args.output)
+    if args.compare:
+        compare(args.output, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())